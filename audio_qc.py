@@ -0,0 +1,195 @@
+import os
+import numpy as np
+import pandas as pd
+import soundfile as sf
+from tqdm import tqdm
+from checkpointing import atomic_write_csv
+from corpora import clip_filename
+
+# ==========================================
+# PATH CONFIGURATION
+# ==========================================
+# Source of extracted 3-second clips from segment_audio.py
+RAW_CLIPS_DIR = r'F:\speech_to_text_predictor\data\processed\clips'
+# The cleaned labels file (QC columns are written back into it)
+CLEAN_CSV = r'F:\speech_to_text_predictor\data\raw\SEP28k_clean_labels.csv'
+
+# ==========================================
+# QC THRESHOLDS
+# ==========================================
+SAMPLE_RATE = 16000
+BATCH_SIZE = 256           # Clips loaded and scored per vectorized pass
+FRAME_LENGTH = 400         # 25 ms frames for the silence measurement
+
+MIN_RMS = 0.003            # Below this the whole clip is effectively silent
+MIN_PEAK = 0.01            # Nothing above the noise floor
+CLIP_LEVEL = 0.999         # |sample| at or above this counts as clipped
+MAX_CLIP_RATIO = 0.01      # More than 1% clipped samples = distorted
+MAX_DC_OFFSET = 0.05       # Mean far from zero = DC-offset recording
+MAX_ZCR = 0.35             # Mostly hiss / broadband noise
+SILENCE_DB = -50.0         # Frame RMS below this (dBFS) counts as silent
+MAX_SILENCE_FRACTION = 0.8 # Clip is mostly silence
+
+QC_COLUMNS = ['QC_RMS', 'QC_Peak', 'QC_ClipRatio', 'QC_DCOffset',
+              'QC_ZCR', 'QC_SilenceFraction', 'QC_Fail', 'QC_Reason']
+
+
+def load_batch(paths):
+    """
+    Reads a list of clips into one zero-padded (batch, max_len) float32 matrix.
+    Returns the matrix and the true length of every row (0 = unreadable).
+    """
+    signals = []
+    for path in paths:
+        try:
+            y, sr = sf.read(path, dtype='float32', always_2d=True)
+            y = y.mean(axis=1)
+            if sr != SAMPLE_RATE:
+                signals.append(np.zeros(0, dtype=np.float32))
+                continue
+            signals.append(y)
+        except Exception:
+            signals.append(np.zeros(0, dtype=np.float32))
+
+    lengths = np.array([len(y) for y in signals], dtype=np.int64)
+    # Pad to a whole number of frames so the silence pass can reshape in place
+    max_len = max(int(lengths.max()) if len(lengths) else 0, 1)
+    max_len = -(-max_len // FRAME_LENGTH) * FRAME_LENGTH
+
+    batch = np.zeros((len(signals), max_len), dtype=np.float32)
+    for i, y in enumerate(signals):
+        batch[i, :len(y)] = y
+    return batch, lengths
+
+
+def compute_metrics(batch, lengths):
+    """
+    Computes every QC metric for the whole batch in one vectorized pass.
+    Padding is masked out so clips of different lengths are scored fairly.
+    """
+    n = np.maximum(lengths, 1).astype(np.float64)
+    mask = np.arange(batch.shape[1])[None, :] < lengths[:, None]
+    x = batch  # Already zero beyond each clip's length
+    ax = np.abs(x)
+
+    rms = np.sqrt((x.astype(np.float64) ** 2).sum(axis=1) / n)
+    peak = ax.max(axis=1)
+    clip_ratio = (ax >= CLIP_LEVEL).sum(axis=1) / n
+    dc_offset = x.sum(axis=1, dtype=np.float64) / n
+
+    # Zero crossings between neighbouring samples that are both inside the clip
+    signs = np.signbit(x)
+    crossings = (signs[:, 1:] != signs[:, :-1]) & mask[:, 1:]
+    zcr = crossings.sum(axis=1) / np.maximum(lengths - 1, 1)
+
+    # Silence: share of 25 ms frames whose RMS falls under SILENCE_DB
+    frames = x.reshape(len(x), -1, FRAME_LENGTH)
+    frame_valid = mask.reshape(len(x), -1, FRAME_LENGTH).sum(axis=2)
+    frame_rms = np.sqrt((frames.astype(np.float64) ** 2).sum(axis=2) / np.maximum(frame_valid, 1))
+    silence_level = 10 ** (SILENCE_DB / 20)
+    silent = (frame_rms < silence_level) & (frame_valid > 0)
+    n_frames = np.maximum((frame_valid > 0).sum(axis=1), 1)
+    silence_fraction = silent.sum(axis=1) / n_frames
+
+    return {
+        'QC_RMS': rms,
+        'QC_Peak': peak.astype(np.float64),
+        'QC_ClipRatio': clip_ratio,
+        'QC_DCOffset': dc_offset,
+        'QC_ZCR': zcr,
+        'QC_SilenceFraction': silence_fraction,
+    }
+
+
+def apply_thresholds(metrics, lengths):
+    """Returns a 0/1 fail flag and a ';'-joined reason string per clip."""
+    checks = [
+        ('unreadable', lengths == 0),
+        ('silent', metrics['QC_RMS'] < MIN_RMS),
+        ('low_peak', metrics['QC_Peak'] < MIN_PEAK),
+        ('clipped', metrics['QC_ClipRatio'] > MAX_CLIP_RATIO),
+        ('dc_offset', np.abs(metrics['QC_DCOffset']) > MAX_DC_OFFSET),
+        ('noisy', metrics['QC_ZCR'] > MAX_ZCR),
+        ('mostly_silence', metrics['QC_SilenceFraction'] > MAX_SILENCE_FRACTION),
+    ]
+    fail = np.zeros(len(lengths), dtype=bool)
+    reasons = [[] for _ in range(len(lengths))]
+    for name, hit in checks:
+        fail |= hit
+        for i in np.flatnonzero(hit):
+            reasons[i].append(name)
+    return fail.astype(int), [";".join(r) for r in reasons]
+
+
+def run_qc(df, clips_dir, batch_size=BATCH_SIZE):
+    """
+    Scores every row of the label table whose clip exists in clips_dir.
+    Rows without a clip on disk keep NaN metrics and QC_Fail = 0, so the
+    downstream "is the file present" checks still decide what happens to them.
+    """
+    df = df.drop(columns=[c for c in QC_COLUMNS if c in df.columns])
+    available_clips = set(os.listdir(clips_dir))
+
+    names = df.apply(clip_filename, axis=1)
+    present = np.flatnonzero(names.isin(available_clips).to_numpy())
+
+    results = {c: np.full(len(df), np.nan) for c in QC_COLUMNS[:-2]}
+    fail_col = np.zeros(len(df), dtype=int)
+    reason_col = np.full(len(df), "", dtype=object)
+
+    for start in tqdm(range(0, len(present), batch_size), desc="QC Batches"):
+        idx = present[start:start + batch_size]
+        paths = [os.path.join(clips_dir, names.iloc[i]) for i in idx]
+        batch, lengths = load_batch(paths)
+        metrics = compute_metrics(batch, lengths)
+        fail, reasons = apply_thresholds(metrics, lengths)
+
+        for col, values in metrics.items():
+            results[col][idx] = values
+        fail_col[idx] = fail
+        reason_col[idx] = reasons
+
+    df = df.copy()
+    for col, values in results.items():
+        df[col] = np.round(values, 6)
+    df['QC_Fail'] = fail_col
+    df['QC_Reason'] = reason_col
+    return df, len(present)
+
+
+def main():
+    print("\n" + "="*40)
+    print("   AUDIO QUALITY CONTROL PRE-PASS")
+    print("="*40)
+
+    try:
+        df = pd.read_csv(CLEAN_CSV)
+        print(f"Successfully loaded {len(df)} entries from clean labels.")
+    except Exception as e:
+        print(f"Error loading CSV: {e}")
+        return
+
+    if not os.path.exists(RAW_CLIPS_DIR):
+        print(f"Error: Clips folder not found at {RAW_CLIPS_DIR}. Run segment_audio.py first.")
+        return
+
+    df, scored = run_qc(df, RAW_CLIPS_DIR)
+
+    # Flag the label store in place so every later stage sees the verdict
+    atomic_write_csv(df, CLEAN_CSV)
+
+    failed = df[df['QC_Fail'] == 1]
+    reason_counts = failed['QC_Reason'].str.split(';').explode().value_counts()
+
+    print("\n" + "="*40)
+    print(f"Clips scored:  {scored}")
+    print(f"Clips flagged: {len(failed)}")
+    for reason, count in reason_counts.items():
+        print(f"  - {reason}: {count}")
+    print(f"QC columns written to: {CLEAN_CSV}")
+    print("="*40)
+    print("NEXT STEP: Run audio_standardization.py (flagged clips are skipped).")
+
+
+if __name__ == "__main__":
+    main()
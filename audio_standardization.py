@@ -1,8 +1,9 @@
 import os
 import pandas as pd
 import librosa
-import soundfile as sf
 from tqdm import tqdm
+from checkpointing import Journal, atomic_write_audio, atomic_write_csv
+from corpora import clip_filename
 
 # ==========================================
 # PATH CONFIGURATION
@@ -10,15 +11,73 @@ from tqdm import tqdm
 # Source of extracted 3-second clips from segment_audio.py
 RAW_CLIPS_DIR = r'F:\speech_to_text_predictor\data\processed\clips'
 # The cleaned labels file you uploaded
-CLEAN_CSV = r'F:\speech_to_text_predictor\data\raw\SEP28k_clean_labels.csv' 
+CLEAN_CSV = r'F:\speech_to_text_predictor\data\raw\SEP28k_clean_labels.csv'
 # Destination for standardized audio
 OUTPUT_AUDIO_DIR = r'F:\speech_to_text_predictor\data\processed\standardized_audio'
 # Destination for the Master Synced CSV
 SYNCED_CSV_PATH = r'F:\speech_to_text_predictor\data\processed\synced_standardized_labels.csv'
+# Progress snapshots go here; the Master CSV is only written once every clip is handled
+SYNCED_PARTIAL_PATH = SYNCED_CSV_PATH + '.partial'
+# Append-only record of finished clips (delete it to force a full re-run)
+JOURNAL_PATH = os.path.join(OUTPUT_AUDIO_DIR, '_standardization.journal')
+
+# Flush the journal and snapshot the partial Synced CSV every N processed clips
+CHECKPOINT_EVERY = 1000
+
+def standardize_clip(in_path, out_path):
+    """Peak-normalizes one clip. Returns 'ok', 'empty' or 'failed'."""
+    try:
+        # Load Audio at 16kHz (AI standard)
+        y, sr = librosa.load(in_path, sr=16000)
+
+        if len(y) == 0:
+            return "empty"
+
+        # Peak Normalization: Scale volume so max peak is 1.0
+        # This removes volume bias between different podcast episodes
+        y_norm = librosa.util.normalize(y)
+
+        # Save the new standardized file
+        atomic_write_audio(out_path, y_norm, sr)
+        return "ok"
+    except Exception:
+        # If a specific file is corrupted, we skip it (and remember that)
+        return "failed"
+
+def clip_stamp(path):
+    """Size and mtime of a source clip; changes whenever segmentation re-cuts it."""
+    if not os.path.exists(path):
+        return "missing"
+    st = os.stat(path)
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+def journal_entry(status, in_path):
+    """Journal status for one clip: the result plus the stamp of the source it was made from."""
+    return f"{status} {clip_stamp(in_path)}"
+
+def is_current(entry, in_path):
+    """
+    True if a journal entry can be reused: it was written for exactly this
+    source clip and did not fail. Failures and re-cut clips are redone.
+    """
+    status, _, stamp = entry.partition(" ")
+    return status != "failed" and stamp == clip_stamp(in_path)
+
+def entry_ok(entry):
+    return entry.partition(" ")[0] == "ok"
+
+def synced_rows(df, journal, available_clips):
+    """
+    Rows whose standardized clip is on disk and whose source clip still
+    exists, in the original CSV order. The second check keeps a resumed run
+    identical to a fresh one after clips were dropped by re-segmentation.
+    """
+    ok = {k for k, entry in journal.load().items() if entry_ok(entry)}
+    return df[df.apply(clip_filename, axis=1).isin(ok & available_clips)]
 
 def main():
     print("Starting Audio Standardization & Master Sync...")
-    
+
     if not os.path.exists(OUTPUT_AUDIO_DIR):
         os.makedirs(OUTPUT_AUDIO_DIR, exist_ok=True)
 
@@ -30,47 +89,59 @@ def main():
         print(f"Error loading CSV: {e}")
         return
 
+    # Drop clips flagged by audio_qc.py so silent/clipped audio never gets normalized
+    if 'QC_Fail' in df.columns:
+        qc_failed = int((df['QC_Fail'] == 1).sum())
+        df = df[df['QC_Fail'] != 1]
+        print(f"Skipping {qc_failed} clips flagged by the QC pre-pass.")
+    else:
+        print("Warning: No QC columns found. Run audio_qc.py first to skip bad clips.")
+
     # 2. Identify clips physically present on the F: drive
     available_clips = set(os.listdir(RAW_CLIPS_DIR))
     print(f"Found {len(available_clips)} physical .wav files in clips folder.")
 
-    standardized_rows = []
-    
+    # Resume: anything already in the journal was fully written last time
+    # (entries for failed or since re-cut clips are redone below)
+    journal = Journal(JOURNAL_PATH)
+    done = journal.load()
+    if done:
+        print(f"Resuming: {len(done)} clips in the journal of a previous run.")
+
+    processed = 0
+
     # 3. Processing Loop
-    for _, row in tqdm(df.iterrows(), total=len(df), desc="Standardizing Audio"):
-        # Match the filename convention used in segment_audio.py
-        show_name = "".join(x for x in str(row['Show']) if x.isalnum())
-        fname = f"SEP28k_{show_name}_{row['EpId']}_{row['ClipId']}.wav"
-        
-        if fname in available_clips:
+    with journal:
+        for _, row in tqdm(df.iterrows(), total=len(df), desc="Standardizing Audio"):
+            fname = clip_filename(row)
+
+            if fname not in available_clips:
+                continue
+
             in_path = os.path.join(RAW_CLIPS_DIR, fname)
             out_path = os.path.join(OUTPUT_AUDIO_DIR, fname)
-            
-            try:
-                # Load Audio at 16kHz (AI standard)
-                y, sr = librosa.load(in_path, sr=16000)
-                
-                if len(y) > 0:
-                    # Peak Normalization: Scale volume so max peak is 1.0
-                    # This removes volume bias between different podcast episodes
-                    y_norm = librosa.util.normalize(y)
-                    
-                    # Save the new standardized file
-                    sf.write(out_path, y_norm, sr)
-                    
-                    # Add this row to our "Verified" list
-                    standardized_rows.append(row)
-            except Exception:
-                # If a specific file is corrupted, we skip it
+
+            if fname in done and is_current(done[fname], in_path):
                 continue
 
+            # Journal only after the file is safely on disk ("ok" = Verified)
+            journal.append(fname, journal_entry(standardize_clip(in_path, out_path), in_path))
+
+            processed += 1
+            if processed % CHECKPOINT_EVERY == 0:
+                journal.sync()
+                atomic_write_csv(synced_rows(df, journal, available_clips), SYNCED_PARTIAL_PATH)
+
     # 4. Generate the Final Synced CSV
-    if standardized_rows:
-        synced_df = pd.DataFrame(standardized_rows)
-        synced_df.to_csv(SYNCED_CSV_PATH, index=False)
-        
+    synced_df = synced_rows(df, journal, available_clips)
+    if len(synced_df):
+        atomic_write_csv(synced_df, SYNCED_CSV_PATH)
+        if os.path.exists(SYNCED_PARTIAL_PATH):
+            os.remove(SYNCED_PARTIAL_PATH)
+
         print("\n" + "="*40)
         print("SUCCESS: Standardization & Sync Complete")
+        print(f"Clips processed this run: {processed}")
         print(f"Total Clips Synced: {len(synced_df)}")
         print(f"Master CSV Created: {SYNCED_CSV_PATH}")
         print(f"Standardized Audio: {OUTPUT_AUDIO_DIR}")
@@ -80,4 +151,4 @@ def main():
         print("\nERROR: No clips were matched or processed. Check your file paths.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
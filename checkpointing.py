@@ -0,0 +1,130 @@
+import os
+import json
+import pickle
+import shutil
+import numpy as np
+import soundfile as sf
+
+# ==========================================
+# CRASH-SAFE WRITE HELPERS
+# ==========================================
+# Every write goes to a temporary file in the same folder first and is then
+# swapped in with os.replace, which is atomic on both Windows and POSIX.
+# A crash therefore leaves either the old file or the new one, never half of one.
+
+TMP_SUFFIX = ".part"
+
+
+def atomic_write_csv(df, path):
+    """Writes a DataFrame to CSV without ever exposing a half-written file."""
+    tmp_path = path + TMP_SUFFIX
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def atomic_write_json(obj, path):
+    """Writes a JSON document (e.g. run stats) via temp-file-plus-rename."""
+    tmp_path = path + TMP_SUFFIX
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def atomic_write_audio(path, y, sr):
+    """Writes a WAV file via temp-file-plus-rename."""
+    tmp_path = path + TMP_SUFFIX
+    sf.write(tmp_path, y, sr, format='WAV')
+    os.replace(tmp_path, path)
+
+
+def atomic_write_npz(path, **arrays):
+    """Writes a compressed .npz file via temp-file-plus-rename."""
+    tmp_path = path + TMP_SUFFIX
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def atomic_write_pickle(obj, path):
+    """Pickles obj (e.g. a model checkpoint) via temp-file-plus-rename."""
+    tmp_path = path + TMP_SUFFIX
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def atomic_copy(src, dst):
+    """Copies src to dst via temp-file-plus-rename."""
+    tmp_path = dst + TMP_SUFFIX
+    shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+class Journal:
+    """
+    Append-only log of completed work items, one 'key<TAB>status' per line.
+
+    Items are appended only after their output has been atomically written,
+    so anything listed in the journal is guaranteed to be on disk. A line cut
+    short by a crash has no trailing newline and is ignored on reload, which
+    simply means that item gets redone.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fh = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        """Returns {key: status} for every fully written line."""
+        done = {}
+        if not self.exists():
+            return done
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                key, _, status = line.rstrip("\n").partition("\t")
+                done[key] = status
+        return done
+
+    def append(self, key, status="ok"):
+        if self._fh is None:
+            self._truncate_partial_line()
+            self._fh = open(self.path, "a", encoding="utf-8")
+        self._fh.write(f"{key}\t{status}\n")
+        self._fh.flush()
+
+    def sync(self):
+        """Forces everything appended so far onto the disk (call at checkpoints)."""
+        if self._fh is not None:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+
+    def close(self):
+        if self._fh is not None:
+            self.sync()
+            self._fh.close()
+            self._fh = None
+
+    def reset(self):
+        self.close()
+        if self.exists():
+            os.remove(self.path)
+
+    def _truncate_partial_line(self):
+        # Drop a torn last line left by a crash so new entries start cleanly
+        if not self.exists():
+            return
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,11 +1,13 @@
 import os
+import hashlib
 import pandas as pd
 import random
 import librosa
-import soundfile as sf
 import shutil
 import numpy as np
 from tqdm import tqdm
+from checkpointing import Journal, atomic_copy, atomic_write_audio
+from corpora import clip_filename
 
 # ==========================================
 # PATH CONFIGURATION
@@ -13,100 +15,165 @@ from tqdm import tqdm
 SYNC_CSV = r'F:\speech_to_text_predictor\data\processed\synced_standardized_labels.csv'
 SYNC_DIR = r'F:\speech_to_text_predictor\data\processed\standardized_audio'
 BALANCED_DIR = r'F:\speech_to_text_predictor\data\processed\balanced_dataset'
+# Append-only record of finished files inside the balanced folder;
+# present = resume, absent = fresh rebuild
+JOURNAL_NAME = '_balancing.journal'
 
 # TARGET: 10,000 samples per class
-TARGET = 10000 
+TARGET = 10000
 
-def augment_audio(y, sr):
+# Fixed seed so a resumed run makes exactly the same choices as an uninterrupted one
+SEED = 42
+
+# Flush the journal to disk every N written files
+CHECKPOINT_EVERY = 500
+
+STUTTER_TYPES = ['Prolongation', 'Block', 'SoundRep', 'WordRep', 'Interjection', 'NoStutteredWords']
+
+def augment_audio(y, sr, rng=None):
     """
     Creates high-quality synthetic variations of stuttering clips.
+    Pass a seeded np.random.Generator to make the variation reproducible.
     """
-    choice = random.choice(['pitch', 'speed', 'noise'])
-    
+    if rng is None:
+        rng = np.random.default_rng()
+    choice = rng.choice(['pitch', 'speed', 'noise'])
+
     if choice == 'pitch':
-        return librosa.effects.pitch_shift(y, sr=sr, n_steps=random.uniform(-2, 2))
+        return librosa.effects.pitch_shift(y, sr=sr, n_steps=rng.uniform(-2, 2))
     elif choice == 'speed':
-        return librosa.effects.time_stretch(y, rate=random.uniform(0.8, 1.2))
+        return librosa.effects.time_stretch(y, rate=rng.uniform(0.8, 1.2))
     else:
-        noise_amp = 0.005 * np.random.uniform() * np.amax(y)
-        return y + noise_amp * np.random.normal(size=y.shape)
+        noise_amp = 0.005 * rng.uniform() * np.amax(y)
+        return y + noise_amp * rng.normal(size=y.shape)
 
-def main():
-    print(f"--- Rebuilding Balanced Dataset (Target: {TARGET} per class) ---")
-    
-    if not os.path.exists(SYNC_CSV):
-        print(f"Error: Synced CSV not found at {SYNC_CSV}.")
-        return
-
-    # RE-CREATE DIRECTORY STRUCTURE
-    if os.path.exists(BALANCED_DIR):
-        print("Cleaning existing balanced directory...")
-        shutil.rmtree(BALANCED_DIR)
-    
-    os.makedirs(BALANCED_DIR)
-    print(f"Created fresh directory at: {BALANCED_DIR}")
-
-    df = pd.read_csv(SYNC_CSV)
-    stutter_types = ['Prolongation', 'Block', 'SoundRep', 'WordRep', 'Interjection', 'NoStutteredWords']
-    
-    for s_type in stutter_types:
-        class_dir = os.path.join(BALANCED_DIR, s_type)
-        os.makedirs(class_dir, exist_ok=True)
-        
-        # Filter data for this class
-        sub_df = df[df[s_type] == 1]
-        available_rows = sub_df.to_dict('records')
-        current_count = len(available_rows)
-        
-        if current_count == 0:
-            print(f"Skipping {s_type}: No original samples found in CSV.")
-            continue
-
-        print(f"\nProcessing {s_type}: {current_count} source samples.")
-
-        # CASE 1: UNDERSAMPLING
-        if current_count >= TARGET:
-            selected = random.sample(available_rows, TARGET)
-            for row in tqdm(selected, desc=f"Undersampling {s_type}"):
-                show = "".join(x for x in str(row['Show']) if x.isalnum())
-                fname = f"SEP28k_{show}_{row['EpId']}_{row['ClipId']}.wav"
-                src = os.path.join(SYNC_DIR, fname)
-                if os.path.exists(src):
-                    shutil.copy(src, os.path.join(class_dir, fname))
-
-        # CASE 2: OVERSAMPLING & AUGMENTATION
-        else:
-            # 1. Copy all originals
-            for row in available_rows:
-                show = "".join(x for x in str(row['Show']) if x.isalnum())
-                fname = f"SEP28k_{show}_{row['EpId']}_{row['ClipId']}.wav"
-                src = os.path.join(SYNC_DIR, fname)
-                if os.path.exists(src):
-                    shutil.copy(src, os.path.join(class_dir, fname))
-            
-            # 2. Augment to fill the gap
-            existing_files = [n for n in os.listdir(class_dir) if n.endswith('.wav')]
-            needed = TARGET - len(existing_files)
-            
-            if needed > 0:
-                for i in tqdm(range(needed), desc=f"Augmenting {s_type}"):
-                    row = random.choice(available_rows)
-                    show = "".join(x for x in str(row['Show']) if x.isalnum())
-                    fname = f"SEP28k_{show}_{row['EpId']}_{row['ClipId']}.wav"
-                    src = os.path.join(SYNC_DIR, fname)
-                    
+def plan_class(s_type, available_rows, sync_dir=SYNC_DIR, target=TARGET):
+    """
+    Decides every output file for one class up front.
+    Returns (out_fname, src_fname, aug_seed) tuples; aug_seed is None for plain copies.
+    The RNG is seeded per class, so the plan is identical on every run.
+    """
+    rng = random.Random(f"{SEED}-{s_type}")
+
+    # CASE 1: UNDERSAMPLING
+    if len(available_rows) >= target:
+        selected = rng.sample(available_rows, target)
+        return [(clip_filename(row), clip_filename(row), None) for row in selected]
+
+    # CASE 2: OVERSAMPLING & AUGMENTATION
+    # 1. Copy all originals
+    plan = []
+    for row in available_rows:
+        fname = clip_filename(row)
+        if os.path.exists(os.path.join(sync_dir, fname)):
+            plan.append((fname, fname, None))
+
+    # 2. Augment to fill the gap
+    needed = target - len(plan)
+    for i in range(max(needed, 0)):
+        fname = clip_filename(rng.choice(available_rows))
+        plan.append((f"aug_{i}_{fname}", fname, rng.getrandbits(32)))
+    return plan
+
+def inputs_fingerprint(sync_csv=SYNC_CSV, target=TARGET):
+    """Identifies the inputs a journal was written for; a mismatch forces a rebuild."""
+    with open(sync_csv, "rb") as f:
+        digest = hashlib.md5(f.read()).hexdigest()
+    return f"{digest}-{target}-{SEED}"
+
+def balance_dataset(sync_csv=SYNC_CSV, sync_dir=SYNC_DIR, balanced_dir=BALANCED_DIR, target=TARGET):
+    """
+    Builds balanced_dir/<class>/ with `target` files per class.
+    Returns {class: files written in total} (0 for classes with no samples).
+    """
+    print(f"--- Rebuilding Balanced Dataset (Target: {target} per class) ---")
+
+    if not os.path.exists(sync_csv):
+        print(f"Error: Synced CSV not found at {sync_csv}.")
+        return None
+
+    fingerprint = inputs_fingerprint(sync_csv, target)
+    journal = Journal(os.path.join(balanced_dir, JOURNAL_NAME))
+    done = journal.load()
+
+    # RESUME if the journal matches these inputs, otherwise RE-CREATE DIRECTORY STRUCTURE
+    if done.get("__inputs__") == fingerprint:
+        print(f"Resuming: {len(done) - 1} files already written by a previous run.")
+    else:
+        if os.path.exists(balanced_dir):
+            print("Cleaning existing balanced directory...")
+            shutil.rmtree(balanced_dir)
+        os.makedirs(balanced_dir)
+        print(f"Created fresh directory at: {balanced_dir}")
+        done = {}
+        journal.append("__inputs__", fingerprint)
+        journal.sync()
+
+    df = pd.read_csv(sync_csv)
+    # Never spend augmentation time on clips the QC pre-pass rejected
+    if 'QC_Fail' in df.columns:
+        df = df[df['QC_Fail'] != 1]
+
+    written = 0
+
+    with journal:
+        for s_type in STUTTER_TYPES:
+            class_dir = os.path.join(balanced_dir, s_type)
+            os.makedirs(class_dir, exist_ok=True)
+
+            # Filter data for this class
+            sub_df = df[df[s_type] == 1]
+            available_rows = sub_df.to_dict('records')
+            current_count = len(available_rows)
+
+            if current_count == 0:
+                print(f"Skipping {s_type}: No original samples found in CSV.")
+                continue
+
+            print(f"\nProcessing {s_type}: {current_count} source samples.")
+
+            plan = plan_class(s_type, available_rows, sync_dir, target)
+            remaining = [p for p in plan if f"{s_type}/{p[0]}" not in done]
+            if len(remaining) < len(plan):
+                print(f"{len(plan) - len(remaining)} of {len(plan)} files already done.")
+
+            for out_fname, src_fname, aug_seed in tqdm(remaining, desc=f"Balancing {s_type}"):
+                src = os.path.join(sync_dir, src_fname)
+                dst = os.path.join(class_dir, out_fname)
+                key = f"{s_type}/{out_fname}"
+
+                if aug_seed is None:
+                    if os.path.exists(src):
+                        atomic_copy(src, dst)
+                        journal.append(key, "ok")
+                    else:
+                        journal.append(key, "missing")
+                else:
                     try:
                         y, sr = librosa.load(src, sr=16000)
-                        y_aug = augment_audio(y, sr)
-                        aug_fname = f"aug_{i}_{fname}"
-                        sf.write(os.path.join(class_dir, aug_fname), y_aug, sr)
+                        y_aug = augment_audio(y, sr, np.random.default_rng(aug_seed))
+                        atomic_write_audio(dst, y_aug, sr)
+                        journal.append(key, "ok")
                     except Exception:
-                        continue
+                        journal.append(key, "failed")
+
+                written += 1
+                if written % CHECKPOINT_EVERY == 0:
+                    journal.sync()
 
     print("\n" + "="*40)
-    print(f"REBUILD COMPLETE: All folders recreated in {BALANCED_DIR}")
+    print(f"REBUILD COMPLETE: All folders recreated in {balanced_dir}")
+    print(f"Files handled this run: {written}")
     print("="*40)
 
+    counts = {s_type: 0 for s_type in STUTTER_TYPES}
+    for key, status in journal.load().items():
+        if status == "ok" and "/" in key:
+            counts[key.split("/", 1)[0]] += 1
+    return counts
+
+def main():
+    balance_dataset(SYNC_CSV, SYNC_DIR, BALANCED_DIR, TARGET)
+
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
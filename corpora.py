@@ -0,0 +1,155 @@
+import os
+import pandas as pd
+
+# ==========================================
+# PATH CONFIGURATION
+# ==========================================
+SEP_EPISODES = os.path.join('data', 'raw', 'SEP-28k_episodes.csv')
+SEP_LABELS = os.path.join('data', 'raw', 'SEP-28k_labels.csv')
+FLUENCYBANK_EPISODES = os.path.join('data', 'processed', 'fluencybank_episodes.csv')
+FLUENCYBANK_LABELS = os.path.join('data', 'fluencybank_labels.csv')
+
+# Shared SEP-28k / FluencyBank label schema (vote counts per clip)
+LABEL_COLUMNS = [
+    "Unsure",
+    "PoorAudioQuality",
+    "Prolongation",
+    "Block",
+    "SoundRep",
+    "WordRep",
+    "DifficultToUnderstand",
+    "Interjection",
+    "NoStutteredWords",
+    "NaturalPause",
+    "Music",
+    "NoSpeech"
+]
+INDEX_COLUMNS = ["Corpus", "Show", "EpId", "ClipId", "Start", "Stop"]
+
+
+def clean_name(value):
+    """Strips everything but letters and digits (filename safety)."""
+    return "".join(x for x in str(value) if x.isalnum())
+
+
+def clean_mask(df):
+    """Rows removed by the label cleaning rules (see label_cleaning.py)."""
+    bad_mask = (
+        (df["Unsure"] == 1) |
+        (df["PoorAudioQuality"] == 1) |
+        (df["Music"] == 1)
+    )
+    if "NoSpeech" in df.columns:
+        bad_mask = bad_mask | (df["NoSpeech"] == 1)
+    return bad_mask
+
+
+class Corpus:
+    """
+    Adapter describing one corpus: where its episode list and labels live,
+    how those files are laid out, and how its audio files are named.
+    Everything else (download, segmentation, QC, standardization) is shared.
+    """
+    key = None
+    episodes_csv = None
+    labels_csv = None
+
+    def read_episodes(self):
+        """Returns a DataFrame with Show, EpId and Url columns."""
+        raise NotImplementedError
+
+    def read_labels(self):
+        """Returns the clip labels with INDEX_COLUMNS + LABEL_COLUMNS."""
+        df = pd.read_csv(self.labels_csv, skipinitialspace=True)
+        df["Show"] = df["Show"].astype(str).str.strip()
+        df["Corpus"] = self.key
+        for col in LABEL_COLUMNS:
+            if col not in df.columns:
+                df[col] = 0
+        return df[INDEX_COLUMNS + LABEL_COLUMNS]
+
+    def episode_filename(self, show, ep_id, url=""):
+        raise NotImplementedError
+
+    def legacy_episode_filename(self, show, ep_id, url=""):
+        """Name older downloaders gave this episode, or None if it never changed."""
+        return None
+
+    def clip_filename(self, show, ep_id, clip_id):
+        raise NotImplementedError
+
+
+class SEP28kCorpus(Corpus):
+    key = "sep28k"
+    episodes_csv = SEP_EPISODES
+    labels_csv = SEP_LABELS
+
+    def read_episodes(self):
+        # SEP-28k format: URL in index 2, Show in index 3, EpId in index 4
+        df = pd.read_csv(self.episodes_csv, header=None, skipinitialspace=True)
+        episodes = pd.DataFrame({
+            "Show": df[3].astype(str).str.strip(),
+            "EpId": pd.to_numeric(df[4], errors="coerce"),
+            "Url": df[2].astype(str).str.strip().str.split(" ").str[0],
+        })
+        return episodes.dropna(subset=["EpId"]).astype({"EpId": int})
+
+    def episode_filename(self, show, ep_id, url=""):
+        # EpId restarts at 0 for every show, so the show has to be part of the name
+        return f"SEP28k_{clean_name(show)}_{ep_id}.mp3"
+
+    def legacy_episode_filename(self, show, ep_id, url=""):
+        # What download_datasets.py used to save; shared by every show with this EpId
+        return f"SEP28k_{ep_id}.mp3"
+
+    def clip_filename(self, show, ep_id, clip_id):
+        return f"SEP28k_{clean_name(show)}_{ep_id}_{clip_id}.wav"
+
+
+class FluencyBankCorpus(Corpus):
+    key = "fluencybank"
+    episodes_csv = FLUENCYBANK_EPISODES
+    labels_csv = FLUENCYBANK_LABELS
+
+    def read_episodes(self):
+        # FluencyBank format: Show in index 0, EpId in index 1, URL in index 2
+        df = pd.read_csv(self.episodes_csv, header=None, skipinitialspace=True)
+        episodes = pd.DataFrame({
+            "Show": df[0].astype(str).str.strip(),
+            "EpId": pd.to_numeric(df[1], errors="coerce"),
+            "Url": df[2].astype(str).str.strip(),
+        })
+        return episodes.dropna(subset=["EpId"]).astype({"EpId": int})
+
+    def episode_filename(self, show, ep_id, url=""):
+        # Interviews are hosted as .mp4; keep whatever extension the host uses
+        ext = os.path.splitext(str(url))[1] or ".mp4"
+        return f"FluencyBank_{ep_id}{ext}"
+
+    def clip_filename(self, show, ep_id, clip_id):
+        return f"FluencyBank_{ep_id}_{clip_id}.wav"
+
+
+CORPORA = {c.key: c for c in (SEP28kCorpus(), FluencyBankCorpus())}
+
+
+def clip_filename(row):
+    """
+    Filename of a labelled clip. Rows from the shared clip index carry it in
+    'ClipFile'; plain SEP-28k label rows fall back to the SEP-28k convention.
+    """
+    if "ClipFile" in row and isinstance(row["ClipFile"], str):
+        return row["ClipFile"]
+    corpus = CORPORA[row["Corpus"] if "Corpus" in row else "sep28k"]
+    return corpus.clip_filename(row["Show"], row["EpId"], row["ClipId"])
+
+
+def clip_path(row, audio_dir):
+    """
+    Where a clip's audio lives. Merged shard tables (see shard.py) point at
+    the shard's copy through a 'ClipPath' relative to the merged folder,
+    which is then passed as audio_dir.
+    """
+    if "ClipPath" in row and isinstance(row["ClipPath"], str):
+        return os.path.join(audio_dir, row["ClipPath"])
+    return os.path.join(audio_dir, clip_filename(row))
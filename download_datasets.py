@@ -3,6 +3,7 @@ import os
 import time
 import urllib.request
 import ssl
+from corpora import CORPORA
 
 # ---------------------------------------------------------
 # SETUP PATHS
@@ -11,7 +12,6 @@ BASE_DIR = os.getcwd()
 OUTPUT_DIR = os.path.join(BASE_DIR, 'data', 'raw', 'audio')
 SEP_EPISODES = os.path.join(BASE_DIR, 'data', 'raw', 'SEP-28k_episodes.csv')
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 # This bypasses SSL certificate issues common on institutional servers
 ssl._create_default_https_context = ssl._create_unverified_context
 
@@ -51,7 +51,9 @@ def process_sep28k():
         print(f"CRITICAL ERROR: {SEP_EPISODES} not found!")
         return
 
-    # Load CSV (SEP-28k format: URL in index 2, EpId in index 4)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # Load CSV (SEP-28k format: URL in index 2, Show in index 3, EpId in index 4)
     df = pd.read_csv(SEP_EPISODES, header=None)
     
     total_rows = len(df)
@@ -64,7 +66,8 @@ def process_sep28k():
             
             if not url.startswith('http'): continue
             
-            filename = f"SEP28k_{ep_id}.mp3"
+            # EpId repeats across shows, so the name includes the show (see corpora.py)
+            filename = CORPORA['sep28k'].episode_filename(row[3], ep_id)
             save_path = os.path.join(OUTPUT_DIR, filename)
             
             result = download_file(url, save_path)
@@ -0,0 +1,188 @@
+import os
+import zlib
+import shutil
+import hashlib
+import time
+import warnings
+import numpy as np
+import pandas as pd
+import librosa
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+from corpora import clip_path
+from class_balancing import STUTTER_TYPES
+from checkpointing import Journal, atomic_write_npz
+from loader import read_clip
+
+# Suppress librosa/audioread warnings to keep terminal clean
+warnings.filterwarnings('ignore')
+
+# ==========================================
+# PATH CONFIGURATION
+# ==========================================
+SYNC_CSV = r'F:\speech_to_text_predictor\data\processed\synced_standardized_labels.csv'
+SYNC_DIR = r'F:\speech_to_text_predictor\data\processed\standardized_audio'
+# Chunked feature store: <FEATURE_DIR>/train/chunk_00000.npz, .../holdout/...
+FEATURE_DIR = r'F:\speech_to_text_predictor\data\processed\features'
+
+SAMPLE_RATE = 16000
+N_MFCC = 20
+CHUNK_SIZE = 2048          # Clips per feature chunk (~0.4 MB of features)
+HOLDOUT_PERCENT = 20       # Share of episodes kept out of training
+WORKERS = os.cpu_count() or 1
+
+SPLITS = ['train', 'holdout']
+
+
+def holdout_episode(corpus, show, ep_id):
+    """
+    Deterministic episode-level split, so no episode's clips end up on both
+    sides and evaluation can be grouped by EpId.
+    """
+    key = f"{corpus}/{show}/{ep_id}".encode("utf-8")
+    return zlib.crc32(key) % 100 < HOLDOUT_PERCENT
+
+
+def extract_features(y, sr=SAMPLE_RATE):
+    """Fixed-length summary vector of one clip (MFCC + spectral statistics)."""
+    mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=N_MFCC)
+    delta = librosa.feature.delta(mfcc)
+    centroid = librosa.feature.spectral_centroid(y=y, sr=sr)
+    zcr = librosa.feature.zero_crossing_rate(y)
+    rms = librosa.feature.rms(y=y)
+    return np.concatenate([
+        mfcc.mean(axis=1), mfcc.std(axis=1),
+        np.abs(delta).mean(axis=1),
+        [centroid.mean() / sr, centroid.std() / sr],
+        [zcr.mean(), zcr.std(), rms.mean(), rms.std()],
+    ]).astype(np.float32)
+
+
+N_FEATURES = 3 * N_MFCC + 6
+
+
+def clip_features(path):
+    try:
+        return extract_features(read_clip(path))
+    except Exception:
+        # If a specific file is corrupted, we skip it
+        return None
+
+
+def class_labels(df):
+    """
+    One row per (clip, class) using the selection rule of class_balancing.py
+    and the loader (df[s_type] == 1), with the class index in 'Label'.
+    A clip in several classes appears once per class; clips in none are dropped.
+    """
+    frames = [df[df[s_type] == 1].assign(Label=label) for label, s_type in enumerate(STUTTER_TYPES)]
+    # Keep a clip's rows next to each other so a chunk decodes each clip once
+    return pd.concat(frames).sort_index(kind='stable')
+
+
+def chunk_paths(feature_dir, split):
+    """Chunk files of one split, in creation order."""
+    split_dir = os.path.join(feature_dir, split)
+    if not os.path.exists(split_dir):
+        return []
+    return [os.path.join(split_dir, f) for f in sorted(os.listdir(split_dir)) if f.endswith('.npz')]
+
+
+def inputs_fingerprint(df, chunk_size=CHUNK_SIZE):
+    """
+    Identifies the labels table and settings a store was built from; a
+    mismatch forces a rebuild, since chunks would split rows differently.
+    """
+    digest = hashlib.md5(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+    qc = 'qc' if 'QC_Fail' in df.columns else 'noqc'
+    return f"{digest}-{chunk_size}-{HOLDOUT_PERCENT}-{qc}"
+
+
+def build_feature_store(df, audio_dir, feature_dir, workers=WORKERS, chunk_size=CHUNK_SIZE):
+    """
+    Extracts features for every labelled clip and writes them as fixed-size
+    chunks. Memory holds at most one chunk; a journal makes the build resumable
+    as long as the input table and settings match, otherwise the old chunks
+    are removed first.
+    Returns the number of clips featurized in this run.
+    """
+    fingerprint = inputs_fingerprint(df, chunk_size)
+    df = df.copy()
+    if 'Corpus' not in df.columns:
+        df['Corpus'] = 'sep28k'
+    if 'QC_Fail' in df.columns:
+        df = df[df['QC_Fail'] != 1]
+    df = class_labels(df)
+    df['Holdout'] = [holdout_episode(r.Corpus, r.Show, r.EpId) for r in df.itertuples()]
+
+    journal = Journal(os.path.join(feature_dir, '_features.journal'))
+    done = journal.load()
+    if done.get("__inputs__") != fingerprint:
+        # Stale chunks would otherwise still be picked up by chunk_paths()
+        for split in SPLITS:
+            shutil.rmtree(os.path.join(feature_dir, split), ignore_errors=True)
+        journal.reset()
+        os.makedirs(feature_dir, exist_ok=True)
+        done = {}
+        journal.append("__inputs__", fingerprint)
+        journal.sync()
+    featurized = 0
+
+    with journal, ProcessPoolExecutor(max_workers=workers) as pool:
+        for split, part in (('train', df[~df['Holdout']]), ('holdout', df[df['Holdout']])):
+            os.makedirs(os.path.join(feature_dir, split), exist_ok=True)
+            n_chunks = -(-len(part) // chunk_size)
+            for c in tqdm(range(n_chunks), desc=f"Featurizing {split}"):
+                name = f"{split}/chunk_{c:05d}.npz"
+                if name in done:
+                    continue
+                rows = part.iloc[c * chunk_size:(c + 1) * chunk_size]
+                paths = [clip_path(r, audio_dir) for r in rows.to_dict('records')]
+                unique_paths = list(dict.fromkeys(paths))
+                by_path = dict(zip(unique_paths, pool.map(clip_features, unique_paths, chunksize=32)))
+                feats = [by_path[p] for p in paths]
+                keep = np.array([f is not None for f in feats], dtype=bool)
+
+                X = np.stack([f for f in feats if f is not None]) if keep.any() \
+                    else np.zeros((0, N_FEATURES), dtype=np.float32)
+                kept = rows[keep]
+                atomic_write_npz(
+                    os.path.join(feature_dir, name),
+                    X=X,
+                    y=kept['Label'].to_numpy(dtype=np.int64),
+                    Corpus=kept['Corpus'].astype(str).to_numpy(dtype='U'),
+                    Show=kept['Show'].astype(str).to_numpy(dtype='U'),
+                    EpId=kept['EpId'].to_numpy(dtype=np.int64),
+                )
+                journal.append(name, "ok")
+                featurized += len(X)
+    return featurized
+
+
+def main():
+    print("\n" + "="*40)
+    print("   FEATURE STORE BUILDER")
+    print("="*40)
+
+    try:
+        df = pd.read_csv(SYNC_CSV)
+        print(f"Successfully loaded {len(df)} entries from synced labels.")
+    except Exception as e:
+        print(f"Error loading CSV: {e}")
+        return
+
+    start = time.perf_counter()
+    featurized = build_feature_store(df, SYNC_DIR, FEATURE_DIR)
+    elapsed = time.perf_counter() - start
+
+    print("\n" + "="*40)
+    print(f"Clips featurized this run: {featurized} ({featurized / max(elapsed, 1e-9):.0f} clips/sec)")
+    for split in SPLITS:
+        print(f"  - {split}: {len(chunk_paths(FEATURE_DIR, split))} chunks")
+    print(f"Feature store: {FEATURE_DIR}")
+    print("="*40)
+    print("NEXT STEP: Run train.py to fit models on the feature chunks.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+import os
+import argparse
+import warnings
+import pandas as pd
+import librosa
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from tqdm import tqdm
+from corpora import CORPORA, clean_mask
+from checkpointing import Journal, atomic_write_csv
+from download_datasets import download_file
+from segment_audio import extract_clips
+from audio_qc import run_qc
+from audio_standardization import standardize_clip, journal_entry, is_current, entry_ok
+from vad import GateStats, detect_array
+
+# Suppress librosa/audioread warnings to keep terminal clean
+warnings.filterwarnings('ignore')
+
+# ---------------------------------------------------------
+# PATHS
+# ---------------------------------------------------------
+# Full episodes from every corpus land here (same folder download_datasets.py uses)
+AUDIO_DIR = os.path.join('data', 'raw', 'audio')
+# Clips, standardized audio and the shared clip index live under here
+OUTPUT_DIR = os.path.join('data', 'processed')
+
+CLIP_INDEX = 'clip_index.csv'
+SYNCED_CSV = 'synced_standardized_labels.csv'
+CLIPS_SUBDIR = 'clips'
+STANDARDIZED_SUBDIR = 'standardized_audio'
+
+SAMPLE_RATE = 16000
+STAGES = ['download', 'segment', 'qc', 'standardize']
+
+# Downloads are network bound, so they get more threads than there are cores
+DOWNLOAD_WORKERS = 8
+WORKERS = os.cpu_count() or 1
+
+
+def load_episodes(corpus_keys, episode_filter=None):
+    """
+    One episode table for all requested corpora.
+    episode_filter(row) -> bool narrows it down (e.g. to one shard).
+    """
+    frames = []
+    for key in corpus_keys:
+        corpus = CORPORA[key]
+        if not os.path.exists(corpus.episodes_csv):
+            print(f"Warning: {key} episode list not found at {corpus.episodes_csv}. Skipping.")
+            continue
+        episodes = corpus.read_episodes()
+        episodes.insert(0, 'Corpus', key)
+        episodes['AudioFile'] = [
+            corpus.episode_filename(r.Show, r.EpId, r.Url) for r in episodes.itertuples()
+        ]
+        # An old-style download can only be reused if exactly one show wanted that name.
+        # Decided on the full list, before any filter, so shards agree on who owns it.
+        legacy = pd.Series([corpus.legacy_episode_filename(r.Show, r.EpId, r.Url)
+                            for r in episodes.itertuples()], index=episodes.index)
+        owners = episodes.groupby(legacy)['Show'].transform('nunique')
+        episodes['LegacyFile'] = legacy.where(owners == 1)
+        frames.append(episodes)
+
+    if not frames:
+        return pd.DataFrame(columns=['Corpus', 'Show', 'EpId', 'Url', 'AudioFile', 'LegacyFile'])
+    episodes = pd.concat(frames, ignore_index=True)
+    if episode_filter is not None:
+        episodes = episodes[episodes.apply(episode_filter, axis=1)]
+    return episodes.reset_index(drop=True)
+
+
+def load_labels(episodes):
+    """Clean labels of every clip that belongs to one of the given episodes."""
+    frames = []
+    for key in episodes['Corpus'].unique():
+        corpus = CORPORA[key]
+        if not os.path.exists(corpus.labels_csv):
+            print(f"Warning: {key} labels not found at {corpus.labels_csv}. Skipping.")
+            continue
+        labels = corpus.read_labels()
+        labels = labels[~clean_mask(labels)].copy()
+        labels['ClipFile'] = [
+            corpus.clip_filename(r.Show, r.EpId, r.ClipId) for r in labels.itertuples()
+        ]
+        frames.append(labels)
+
+    if not frames:
+        return pd.DataFrame()
+    labels = pd.concat(frames, ignore_index=True)
+    wanted = episodes[['Corpus', 'Show', 'EpId', 'AudioFile']]
+    return labels.merge(wanted.drop_duplicates(['Corpus', 'Show', 'EpId']),
+                        on=['Corpus', 'Show', 'EpId'], how='inner')
+
+
+# ---------------------------------------------------------
+# STAGE WORKERS (top level so the process pool can pickle them)
+# ---------------------------------------------------------
+def _segment_episode(corpus_key, audio_path, clips, clips_dir, use_vad):
+    y, sr = librosa.load(audio_path, sr=SAMPLE_RATE)
+    stats = GateStats()
+    speech_map = detect_array(y, sr) if use_vad else None
+    extract_clips(y, sr, clips, CORPORA[corpus_key], clips_dir, speech_map, stats)
+    return stats
+
+
+def _standardize(paths):
+    return standardize_clip(*paths)
+
+
+# ---------------------------------------------------------
+# STAGES
+# ---------------------------------------------------------
+def adopt_legacy_audio(episodes, audio_dir):
+    """
+    One-time rename of old-style downloads to their per-corpus names.
+    Only unambiguous files are moved; ambiguous ones are left alone and the
+    episode is downloaded again under its new name.
+    """
+    renamed = 0
+    for row in episodes.dropna(subset=['LegacyFile']).itertuples():
+        old_path = os.path.join(audio_dir, row.LegacyFile)
+        new_path = os.path.join(audio_dir, row.AudioFile)
+        if old_path != new_path and os.path.exists(old_path) and not os.path.exists(new_path):
+            os.replace(old_path, new_path)
+            renamed += 1
+    return renamed
+
+
+def download_stage(episodes, audio_dir, workers=DOWNLOAD_WORKERS):
+    os.makedirs(audio_dir, exist_ok=True)
+    results = {}
+    # One task per target file, so no two threads ever write the same path
+    targets = episodes[episodes['Url'].astype(str).str.startswith('http')].drop_duplicates('AudioFile')
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(download_file, row.Url, os.path.join(audio_dir, row.AudioFile)): row.AudioFile
+            for row in targets.itertuples()
+        }
+        for fut in tqdm(as_completed(futures), total=len(futures), desc="Downloading Episodes"):
+            result = fut.result()
+            key = "ERR" if result.startswith("ERR_") else result
+            results[key] = results.get(key, 0) + 1
+    return results
+
+
+def segment_stage(labels, audio_dir, clips_dir, journal, workers=WORKERS, use_vad=True):
+    """
+    Cuts every episode on disk into clips, one episode per worker task.
+    Returns (episodes attempted, episodes failed, combined VAD GateStats).
+    """
+    os.makedirs(clips_dir, exist_ok=True)
+    done = journal.load()
+
+    tasks = []
+    for (corpus_key, show, ep_id, audio_file), clips in labels.groupby(
+            ['Corpus', 'Show', 'EpId', 'AudioFile']):
+        key = f"{corpus_key}/{show}/{ep_id}"
+        path = os.path.join(audio_dir, audio_file)
+        if key in done or not os.path.exists(path):
+            continue
+        tasks.append((key, corpus_key, path, clips))
+
+    failed = 0
+    vad_stats = GateStats()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_segment_episode, corpus_key, path, clips, clips_dir, use_vad): key
+            for key, corpus_key, path, clips in tasks
+        }
+        for fut in tqdm(as_completed(futures), total=len(futures), desc="Segmenting Episodes"):
+            try:
+                vad_stats.merge(fut.result())
+                journal.append(futures[fut], "ok")
+            except Exception:
+                # If one episode is corrupted, skip it and keep going
+                journal.append(futures[fut], "failed")
+                failed += 1
+    journal.sync()
+    return len(tasks), failed, vad_stats
+
+
+def build_clip_index(labels, clips_dir):
+    """The shared clip index: every labelled clip that exists on disk."""
+    available_clips = set(os.listdir(clips_dir)) if os.path.exists(clips_dir) else set()
+    index = labels[labels['ClipFile'].isin(available_clips)]
+    return index.drop(columns=['AudioFile']).reset_index(drop=True)
+
+
+def standardize_stage(index, clips_dir, out_dir, journal, workers=WORKERS):
+    """Peak-normalizes every QC-passing clip; returns the synced rows."""
+    os.makedirs(out_dir, exist_ok=True)
+    done = journal.load()
+
+    if 'QC_Fail' in index.columns:
+        index = index[index['QC_Fail'] != 1]
+
+    # Redo clips that failed or were re-cut since they were standardized
+    todo = [f for f in index['ClipFile']
+            if not (f in done and is_current(done[f], os.path.join(clips_dir, f)))]
+    pairs = [(os.path.join(clips_dir, f), os.path.join(out_dir, f)) for f in todo]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_standardize, pairs, chunksize=64)
+        for (in_path, _), status in tqdm(zip(pairs, results), total=len(todo), desc="Standardizing Audio"):
+            journal.append(os.path.basename(in_path), journal_entry(status, in_path))
+    journal.sync()
+
+    ok = {k for k, entry in journal.load().items() if entry_ok(entry)}
+    return index[index['ClipFile'].isin(ok)]
+
+
+def run_ingest(corpus_keys, audio_dir=AUDIO_DIR, out_dir=OUTPUT_DIR, stages=STAGES,
+               workers=WORKERS, download_workers=DOWNLOAD_WORKERS, episode_filter=None,
+               use_vad=True):
+    """
+    Runs the shared pipeline for any mix of corpora. Every stage is resumable:
+    downloads skip verified files and segmentation/standardization keep journals.
+    Returns (clip_index, synced) DataFrames; either may be None if not built.
+    """
+    clips_dir = os.path.join(out_dir, CLIPS_SUBDIR)
+    std_dir = os.path.join(out_dir, STANDARDIZED_SUBDIR)
+    index_path = os.path.join(out_dir, CLIP_INDEX)
+    os.makedirs(out_dir, exist_ok=True)
+
+    episodes = load_episodes(corpus_keys, episode_filter)
+    print(f"Episodes selected: {len(episodes)} ({', '.join(corpus_keys)})")
+
+    renamed = adopt_legacy_audio(episodes, audio_dir) if os.path.exists(audio_dir) else 0
+    if renamed:
+        print(f"Renamed {renamed} old-style episode downloads to per-corpus names.")
+
+    if 'download' in stages:
+        results = download_stage(episodes, audio_dir, download_workers)
+        print(f"Download results: {results}")
+
+    index = None
+    if 'segment' in stages:
+        labels = load_labels(episodes)
+        print(f"Clean labelled clips in selected episodes: {len(labels)}")
+        if len(labels):
+            with Journal(os.path.join(out_dir, '_segmentation.journal')) as journal:
+                attempted, failed, vad_stats = segment_stage(
+                    labels, audio_dir, clips_dir, journal, workers, use_vad)
+            print(f"Episodes segmented this run: {attempted} ({failed} corrupted)")
+            if use_vad:
+                print(vad_stats.summary())
+            index = build_clip_index(labels, clips_dir)
+            atomic_write_csv(index, index_path)
+    elif os.path.exists(index_path):
+        index = pd.read_csv(index_path)
+
+    if index is None:
+        print("No clip index available. Run the 'segment' stage first.")
+        return None, None
+
+    if 'qc' in stages:
+        index, scored = run_qc(index, clips_dir)
+        atomic_write_csv(index, index_path)
+        print(f"QC scored {scored} clips, flagged {int(index['QC_Fail'].sum())}.")
+
+    synced = None
+    if 'standardize' in stages:
+        with Journal(os.path.join(std_dir, '_standardization.journal')) as journal:
+            synced = standardize_stage(index, clips_dir, std_dir, journal, workers)
+        atomic_write_csv(synced, os.path.join(out_dir, SYNCED_CSV))
+
+    return index, synced
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-corpus download, segmentation, QC and standardization.")
+    parser.add_argument('--corpora', nargs='+', choices=sorted(CORPORA), default=sorted(CORPORA))
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--audio-dir', default=AUDIO_DIR)
+    parser.add_argument('--out-dir', default=OUTPUT_DIR)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--download-workers', type=int, default=DOWNLOAD_WORKERS)
+    parser.add_argument('--no-vad', action='store_true', help="Keep clips even if the VAD finds no speech")
+    args = parser.parse_args()
+
+    print("\n" + "="*40)
+    print("   MULTI-CORPUS INGESTION ENGINE")
+    print("="*40)
+
+    index, synced = run_ingest(args.corpora, args.audio_dir, args.out_dir, args.stages,
+                               args.workers, args.download_workers, use_vad=not args.no_vad)
+
+    print("\n" + "="*40)
+    if index is not None:
+        print("Clips in shared index per corpus:")
+        for key, count in index['Corpus'].value_counts().items():
+            print(f"  - {key}: {count}")
+        print(f"Clip Index: {os.path.join(args.out_dir, CLIP_INDEX)}")
+    if synced is not None:
+        print(f"Total Clips Synced: {len(synced)}")
+        print(f"Master CSV: {os.path.join(args.out_dir, SYNCED_CSV)}")
+    print("="*40)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import pandas as pd
+from corpora import clean_mask
 
 # ✅ Input / Output paths
 IN_CSV  = "data/raw/SEP-28k_labels.csv"
@@ -10,16 +11,10 @@ print("Rows (before):", len(df))
 
 # ✅ 1) Label Cleaning Rules (as per your screenshot)
 # Remove rows where Unsure==1 OR PoorAudioQuality==1 OR Music==1
-bad_mask = (
-    (df["Unsure"] == 1) |
-    (df["PoorAudioQuality"] == 1) |
-    (df["Music"] == 1)
-)
-
 # ✅ (Optional but recommended) Remove clips with NoSpeech==1
 # (Noise only / silence only clips)
-if "NoSpeech" in df.columns:
-    bad_mask = bad_mask | (df["NoSpeech"] == 1)
+# The rules live in corpora.clean_mask so ingest.py applies the same ones
+bad_mask = clean_mask(df)
 
 clean_df = df[~bad_mask].copy()
 
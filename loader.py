@@ -0,0 +1,297 @@
+import os
+import time
+import queue
+import random
+import threading
+import numpy as np
+import pandas as pd
+import soundfile as sf
+from corpora import clip_path
+from class_balancing import STUTTER_TYPES
+
+# ==========================================
+# PATH CONFIGURATION
+# ==========================================
+SYNC_CSV = r'F:\speech_to_text_predictor\data\processed\synced_standardized_labels.csv'
+SYNC_DIR = r'F:\speech_to_text_predictor\data\processed\standardized_audio'
+BALANCED_DIR = r'F:\speech_to_text_predictor\data\processed\balanced_dataset'
+
+SAMPLE_RATE = 16000
+CLIP_SAMPLES = 3 * SAMPLE_RATE   # Every clip is padded/cropped to 3 seconds
+BATCH_SIZE = 32
+NUM_WORKERS = 4                  # Reader threads (soundfile releases the GIL)
+PREFETCH = 4                     # Finished batches waiting for the trainer
+SHUFFLE_BUFFER = 1024            # Clips mixed together before batching
+SEED = 42
+
+_END = object()
+
+
+def items_from_balanced_dir(balanced_dir=BALANCED_DIR):
+    """(path, class_index) for every WAV in the balanced_dataset/<class>/ tree."""
+    items = []
+    for label, s_type in enumerate(STUTTER_TYPES):
+        class_dir = os.path.join(balanced_dir, s_type)
+        if not os.path.exists(class_dir):
+            continue
+        for fname in sorted(os.listdir(class_dir)):
+            if fname.endswith('.wav'):
+                items.append((os.path.join(class_dir, fname), label))
+    return items
+
+
+def items_from_synced_csv(sync_csv=SYNC_CSV, audio_dir=SYNC_DIR):
+    """
+    (path, class_index) straight from the standardized clips, using the same
+    per-class selection as class_balancing.py. A clip in several classes
+    appears once per class. Pair with balanced=True to sample classes evenly
+    without materialising the balanced_dataset copy.
+    """
+    df = pd.read_csv(sync_csv)
+    if 'QC_Fail' in df.columns:
+        df = df[df['QC_Fail'] != 1]
+    items = []
+    for label, s_type in enumerate(STUTTER_TYPES):
+        for row in df[df[s_type] == 1].to_dict('records'):
+            items.append((clip_path(row, audio_dir), label))
+    return items
+
+
+def items_from_manifest(manifest_csv):
+    """
+    (path, class_index) from the balanced_manifest.csv that shard.py merge
+    writes; paths are relative to the manifest's folder.
+    """
+    base = os.path.dirname(manifest_csv)
+    df = pd.read_csv(manifest_csv)
+    labels = {s_type: i for i, s_type in enumerate(STUTTER_TYPES)}
+    return [(os.path.join(base, row['ClipPath']), labels[row['Class']])
+            for row in df.to_dict('records') if row['Class'] in labels]
+
+
+def read_clip(path, clip_samples=CLIP_SAMPLES):
+    """Reads one clip as mono float32, zero-padded or cropped to clip_samples."""
+    y, _ = sf.read(path, dtype='float32', always_2d=True)
+    y = y.mean(axis=1) if y.shape[1] > 1 else y[:, 0]
+    if len(y) >= clip_samples:
+        return y[:clip_samples]
+    out = np.zeros(clip_samples, dtype=np.float32)
+    out[:len(y)] = y
+    return out
+
+
+class BatchLoader:
+    """
+    Multi-threaded, prefetching batch loader over (path, class_index) items.
+
+    Reader threads decode clips in parallel, an assembler thread mixes them
+    through a shuffle buffer and copies them into a small pool of
+    preallocated (batch_size, clip_samples) float32 arrays, and a bounded
+    queue keeps up to `prefetch` finished batches ready for the trainer.
+
+    balanced=True samples a class uniformly first and then a clip from it,
+    so every batch is class-balanced in expectation. Otherwise items are
+    visited in a fresh random order each epoch.
+
+    The arrays are reused: a batch stays valid until the next one is
+    requested, so copy it if it has to outlive the loop iteration.
+    Unreadable clips are skipped, like everywhere else in the pipeline, but
+    once every item has failed without a single successful read in between
+    (wrong audio_dir, missing shard folder) iteration raises an OSError
+    instead of waiting forever.
+    """
+
+    def __init__(self, items, batch_size=BATCH_SIZE, num_batches=None, clip_samples=CLIP_SAMPLES,
+                 num_workers=NUM_WORKERS, prefetch=PREFETCH, shuffle_buffer=SHUFFLE_BUFFER,
+                 balanced=True, seed=SEED, read_fn=read_clip):
+        if not items:
+            raise ValueError("BatchLoader needs at least one item.")
+        self.items = list(items)
+        self.batch_size = batch_size
+        self.num_batches = num_batches or max(len(self.items) // batch_size, 1)
+        self.clip_samples = clip_samples
+        self.num_workers = num_workers
+        self.prefetch = prefetch
+        self.shuffle_buffer = max(shuffle_buffer, batch_size)
+        self.balanced = balanced
+        self.seed = seed
+        self.read_fn = read_fn
+        self.epoch = 0
+        self.wait_seconds = 0.0   # Time the consumer spent blocked on the loader
+
+    def __len__(self):
+        return self.num_batches
+
+    # ---------------- sampling ----------------
+    def _index_stream(self, rng):
+        """Endless stream of item indices."""
+        if self.balanced:
+            by_class = {}
+            for i, (_, label) in enumerate(self.items):
+                by_class.setdefault(label, []).append(i)
+            classes = sorted(by_class)
+            while True:
+                members = by_class[rng.choice(classes)]
+                yield members[rng.randrange(len(members))]
+        else:
+            order = list(range(len(self.items)))
+            while True:
+                rng.shuffle(order)
+                yield from order
+
+    # ---------------- threads ----------------
+    def _put(self, q, value, stop):
+        while not stop.is_set():
+            try:
+                q.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _feed_tasks(self, task_q, stop, rng):
+        for idx in self._index_stream(rng):
+            if not self._put(task_q, idx, stop):
+                return
+
+    def _read_items(self, task_q, sample_q, batch_q, stop, failures):
+        while not stop.is_set():
+            try:
+                idx = task_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            path, label = self.items[idx]
+            try:
+                sample = self.read_fn(path, self.clip_samples)
+            except Exception as e:
+                # Corrupted or missing clip: skip it and keep going,
+                # unless nothing at all has been readable for a full pass
+                with failures['lock']:
+                    failures['items'].add(idx)
+                    give_up = len(failures['items']) == len(self.items)
+                if give_up:
+                    error = OSError(f"None of the {len(self.items)} clips could be read "
+                                    f"(e.g. {path}). Check the audio folder.")
+                    error.__cause__ = e
+                    self._put(batch_q, error, stop)
+                    stop.set()
+                continue
+            with failures['lock']:
+                failures['items'].clear()
+            if not self._put(sample_q, (sample, label), stop):
+                return
+
+    def _assemble(self, sample_q, free_q, batch_q, stop, rng):
+        try:
+            pool = []
+            for _ in range(self.num_batches):
+                while True:
+                    try:
+                        x, y = free_q.get(timeout=0.1)
+                        break
+                    except queue.Empty:
+                        if stop.is_set():
+                            return
+                for row in range(self.batch_size):
+                    while len(pool) < self.shuffle_buffer and not stop.is_set():
+                        try:
+                            pool.append(sample_q.get(timeout=0.1 if pool else 1.0))
+                        except queue.Empty:
+                            if pool:
+                                break
+                    if stop.is_set():
+                        return
+                    # Swap-remove a random element: O(1) shuffle-buffer draw
+                    j = rng.randrange(len(pool))
+                    pool[j], pool[-1] = pool[-1], pool[j]
+                    sample, label = pool.pop()
+                    np.copyto(x[row], sample)
+                    y[row] = label
+                if not self._put(batch_q, (x, y), stop):
+                    return
+            self._put(batch_q, _END, stop)
+        except Exception as e:
+            self._put(batch_q, e, stop)
+
+    # ---------------- iteration ----------------
+    def __iter__(self):
+        rng = random.Random(f"{self.seed}-{self.epoch}")
+        self.epoch += 1
+        stop = threading.Event()
+        task_q = queue.Queue(maxsize=self.shuffle_buffer)
+        sample_q = queue.Queue(maxsize=self.shuffle_buffer)
+        batch_q = queue.Queue(maxsize=self.prefetch)
+
+        # prefetch in the queue + one being filled + one held by the trainer
+        free_q = queue.Queue()
+        for _ in range(self.prefetch + 2):
+            free_q.put((np.zeros((self.batch_size, self.clip_samples), dtype=np.float32),
+                        np.zeros(self.batch_size, dtype=np.int64)))
+
+        threads = [threading.Thread(target=self._feed_tasks, args=(task_q, stop, random.Random(rng.random())))]
+        # Distinct items that failed since the last successful read
+        failures = {'items': set(), 'lock': threading.Lock()}
+        threads += [threading.Thread(target=self._read_items, args=(task_q, sample_q, batch_q, stop, failures))
+                    for _ in range(self.num_workers)]
+        threads.append(threading.Thread(target=self._assemble,
+                                        args=(sample_q, free_q, batch_q, stop, random.Random(rng.random()))))
+        for t in threads:
+            t.daemon = True
+            t.start()
+
+        held = None
+        try:
+            while True:
+                if held is not None:
+                    free_q.put(held)
+                    held = None
+                t0 = time.perf_counter()
+                batch = batch_q.get()
+                self.wait_seconds += time.perf_counter() - t0
+                if batch is _END:
+                    return
+                if isinstance(batch, Exception):
+                    raise batch
+                held = batch
+                yield batch
+        finally:
+            stop.set()
+            for t in threads:
+                t.join(timeout=1.0)
+
+
+def main():
+    print("\n" + "="*40)
+    print("   TRAINING BATCH LOADER BENCHMARK")
+    print("="*40)
+
+    if os.path.exists(BALANCED_DIR):
+        items = items_from_balanced_dir(BALANCED_DIR)
+        source = BALANCED_DIR
+    elif os.path.exists(SYNC_CSV):
+        items = items_from_synced_csv(SYNC_CSV, SYNC_DIR)
+        source = SYNC_CSV
+    else:
+        print(f"Error: Neither {BALANCED_DIR} nor {SYNC_CSV} found.")
+        return
+
+    print(f"Loaded {len(items)} clips from: {source}")
+    loader = BatchLoader(items, num_batches=200)
+
+    counts = np.zeros(len(STUTTER_TYPES), dtype=np.int64)
+    start = time.perf_counter()
+    for x, y in loader:
+        counts += np.bincount(y, minlength=len(STUTTER_TYPES))
+    elapsed = time.perf_counter() - start
+
+    print("\n" + "="*40)
+    print(f"Batches: {len(loader)} x {loader.batch_size} clips in {elapsed:.1f}s")
+    print(f"Throughput: {len(loader) * loader.batch_size / elapsed:.0f} clips/sec")
+    print(f"Trainer waited on I/O: {loader.wait_seconds:.2f}s ({100 * loader.wait_seconds / elapsed:.1f}%)")
+    for s_type, count in zip(STUTTER_TYPES, counts):
+        print(f"  - {s_type}: {count}")
+    print("="*40)
+
+
+if __name__ == "__main__":
+    main()
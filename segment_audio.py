@@ -4,6 +4,8 @@ import soundfile as sf
 import os
 import warnings
 from tqdm import tqdm
+from corpora import CORPORA
+from vad import GateStats, MIN_SPEECH_RATIO, detect_array
 
 # Suppress librosa/audioread warnings to keep terminal clean
 warnings.filterwarnings('ignore')
@@ -15,8 +17,54 @@ AUDIO_DIR = os.path.join('data', 'raw', 'audio')
 SEP_LABELS = os.path.join('data', 'raw', 'SEP-28k_labels.csv')
 CLIPS_OUTPUT = os.path.join('data', 'processed', 'clips')
 
-# Ensure output directory exists
-os.makedirs(CLIPS_OUTPUT, exist_ok=True)
+# Skip clips the voice-activity detector finds (almost) no speech in
+USE_VAD = True
+
+def extract_clips(y, sr, clips, corpus, out_dir, speech_map=None, stats=None):
+    """
+    Cuts every labelled clip of one decoded episode and saves it as a WAV.
+    Shared by this script and the multi-corpus engine in ingest.py.
+    With a vad.SpeechMap, clips that are (almost) all non-speech are skipped
+    and counted in stats. Returns the filenames that were written.
+    """
+    total_samples = len(y)
+    written = []
+
+    for _, row in clips.iterrows():
+        clip_id = row['ClipId']
+        start_sample = int(row['Start'])
+        stop_sample = int(row['Stop'])
+
+        # Boundary Safety Checks
+        if start_sample >= total_samples or start_sample >= stop_sample:
+            continue
+        if stop_sample > total_samples:
+            stop_sample = total_samples
+
+        # Slice the array
+        clip_audio = y[start_sample:stop_sample]
+
+        # Only save if the clip actually has audio data (min 0.1 sec)
+        if len(clip_audio) < 1600:
+            continue
+
+        # Non-speech clips would only be thrown away after QC/standardization
+        if speech_map is not None:
+            if speech_map.speech_fraction(start_sample, stop_sample) < MIN_SPEECH_RATIO:
+                if stats is not None:
+                    stats.skip(len(clip_audio))
+                continue
+            if stats is not None:
+                stats.keep(len(clip_audio))
+
+        clip_name = corpus.clip_filename(row['Show'], row['EpId'], clip_id)
+        save_path = os.path.join(out_dir, clip_name)
+
+        # Save as high-quality WAV for training
+        sf.write(save_path, clip_audio, sr)
+        written.append(clip_name)
+
+    return written
 
 def segment_data():
     print("\n" + "="*40)
@@ -26,6 +74,9 @@ def segment_data():
     if not os.path.exists(SEP_LABELS):
         print(f"Error: Label file not found at {SEP_LABELS}")
         return
+
+    # Ensure output directory exists
+    os.makedirs(CLIPS_OUTPUT, exist_ok=True)
     
     # Load labels (SEP-28k uses a specific header format)
     try:
@@ -41,69 +92,35 @@ def segment_data():
         print("No audio files found in data/raw/audio. Run downloader first.")
         return
 
-    # Extract EpIds from filenames to match with CSV
-    available_epids = []
-    for f in downloaded_files:
-        try:
-            # Filename format: SEP28k_EpId.mp3
-            epid_str = f.split('_')[1].split('.')[0]
-            available_epids.append(int(epid_str))
-        except:
-            continue
-
     # Filter CSV for only the audio we actually have
-    df_available = df[df['EpId'].isin(available_epids)]
+    # Filename format: SEP28k_Show_EpId.mp3 (EpId alone repeats across shows)
+    corpus = CORPORA['sep28k']
+    df['Show'] = df['Show'].astype(str).str.strip()
+    on_disk = set(downloaded_files)
+    df['AudioFile'] = [corpus.episode_filename(show, ep_id) for show, ep_id in zip(df['Show'], df['EpId'])]
+    df_available = df[df['AudioFile'].isin(on_disk)]
     
-    print(f"Episodes found on disk: {len(available_epids)}")
+    print(f"Episodes found on disk: {df_available['AudioFile'].nunique()}")
     print(f"Total labeled clips to extract: {len(df_available)}")
     print("Extracting 3-second segments...")
 
-    # Group by EpId so we only open the large MP3 file once per episode
-    grouped = df_available.groupby('EpId')
+    # Group by episode so we only open the large MP3 file once per episode
+    grouped = df_available.groupby('AudioFile')
     
     success_count = 0
     fail_count = 0
+    vad_stats = GateStats()
 
-    for ep_id, clips in tqdm(grouped, desc="Processing Episodes"):
-        # Find the specific file for this EpId
-        audio_file = next((f for f in downloaded_files if f.startswith(f"SEP28k_{ep_id}.")), None)
-        if not audio_file:
-            continue
-            
+    for audio_file, clips in tqdm(grouped, desc="Processing Episodes"):
         path = os.path.join(AUDIO_DIR, audio_file)
         
         try:
             # Load the audio file (16kHz is industry standard for speech AI)
             # librosa will use the FFmpeg you just installed automatically
             y, sr = librosa.load(path, sr=16000)
-            total_samples = len(y)
-            
-            for _, row in clips.iterrows():
-                clip_id = row['ClipId']
-                start_sample = int(row['Start'])
-                stop_sample = int(row['Stop'])
-                
-                # Boundary Safety Checks
-                if start_sample >= total_samples or start_sample >= stop_sample:
-                    continue
-                if stop_sample > total_samples:
-                    stop_sample = total_samples
-                
-                # Slice the array
-                clip_audio = y[start_sample:stop_sample]
-                
-                # Only save if the clip actually has audio data (min 0.1 sec)
-                if len(clip_audio) < 1600: 
-                    continue
-                
-                # Clean show name for filename safety
-                show_clean = "".join(x for x in str(row['Show']) if x.isalnum())
-                clip_name = f"SEP28k_{show_clean}_{ep_id}_{clip_id}.wav"
-                save_path = os.path.join(CLIPS_OUTPUT, clip_name)
-                
-                # Save as high-quality WAV for training
-                sf.write(save_path, clip_audio, sr)
-                success_count += 1
+            speech_map = detect_array(y, sr) if USE_VAD else None
+            written = extract_clips(y, sr, clips, corpus, CLIPS_OUTPUT, speech_map, vad_stats)
+            success_count += len(written)
                 
         except Exception:
             # If one episode is corrupted, skip it and keep going
@@ -113,6 +130,8 @@ def segment_data():
     print("\n" + "="*40)
     print(f"SUCCESS: {success_count} clips generated.")
     print(f"SKIPPED: {fail_count} episodes (corrupted files).")
+    if USE_VAD:
+        print(vad_stats.summary())
     print(f"Location: {os.path.abspath(CLIPS_OUTPUT)}")
     print("="*40)
 
@@ -0,0 +1,276 @@
+import os
+import sys
+import json
+import zlib
+import argparse
+import subprocess
+import pandas as pd
+import ingest
+from corpora import CORPORA
+from checkpointing import atomic_write_csv, atomic_write_json
+from class_balancing import STUTTER_TYPES, TARGET, balance_dataset
+
+# ---------------------------------------------------------
+# PATHS
+# ---------------------------------------------------------
+# Every shard writes to <SHARD_ROOT>/shard_<i>_of_<n>/; the merge goes to MERGED_DIR
+SHARD_ROOT = os.path.join('data', 'shards')
+MERGED_DIR = os.path.join(SHARD_ROOT, 'merged')
+
+BALANCED_SUBDIR = 'balanced_dataset'
+BALANCED_MANIFEST = 'balanced_manifest.csv'
+STATS_JSON = 'stats.json'
+
+
+def shard_of(corpus, show, ep_id, num_shards):
+    """
+    Stable shard number for one episode. Depends only on the episode's
+    identity, so every node computes the same split from the same CSVs.
+    """
+    key = f"{corpus}/{show}/{ep_id}".encode("utf-8")
+    return zlib.crc32(key) % num_shards
+
+
+def shard_dir(root, shard, num_shards):
+    return os.path.join(root, f"shard_{shard:03d}_of_{num_shards:03d}")
+
+
+def shared_audio_files(corpus_keys, num_shards):
+    """
+    Episode audio files wanted by more than one shard. Must be empty: every
+    shard downloads into the same audio folder, so a shared file would be
+    written by several processes at once.
+    """
+    episodes = ingest.load_episodes(corpus_keys)
+    if not len(episodes):
+        return []
+    shards = [shard_of(r.Corpus, r.Show, r.EpId, num_shards) for r in episodes.itertuples()]
+    owners = episodes.assign(Shard=shards).groupby('AudioFile')['Shard'].nunique()
+    return sorted(owners[owners > 1].index)
+
+
+def run_shard(shard, num_shards, root=SHARD_ROOT, corpus_keys=None, audio_dir=ingest.AUDIO_DIR,
+              stages=ingest.STAGES, workers=ingest.WORKERS, download_workers=ingest.DOWNLOAD_WORKERS,
+              balance=True, use_vad=True):
+    """
+    Runs the full pipeline (ingest stages + class balancing) for the
+    episodes of one shard into that shard's own folder and writes its stats.
+    Returns None without touching any files if the split is not disjoint.
+    """
+    corpus_keys = corpus_keys or sorted(CORPORA)
+    out_dir = shard_dir(root, shard, num_shards)
+
+    shared = shared_audio_files(corpus_keys, num_shards)
+    if shared:
+        print(f"Error: {len(shared)} audio file(s) belong to more than one shard, e.g. {shared[:5]}")
+        return None
+
+    def in_shard(row):
+        return shard_of(row['Corpus'], row['Show'], row['EpId'], num_shards) == shard
+
+    index, synced = ingest.run_ingest(corpus_keys, audio_dir, out_dir, stages, workers,
+                                      download_workers, episode_filter=in_shard, use_vad=use_vad)
+
+    # Each shard contributes its share of the per-class target
+    target = -(-TARGET // num_shards)
+    balanced = {}
+    if balance and synced is not None and len(synced):
+        balanced = balance_dataset(
+            os.path.join(out_dir, ingest.SYNCED_CSV),
+            os.path.join(out_dir, ingest.STANDARDIZED_SUBDIR),
+            os.path.join(out_dir, BALANCED_SUBDIR),
+            target=target,
+        ) or {}
+
+    stats = {
+        'shard': shard,
+        'num_shards': num_shards,
+        'corpora': corpus_keys,
+        'episodes': len(ingest.load_episodes(corpus_keys, in_shard)),
+        'clips_indexed': 0 if index is None else len(index),
+        'qc_failed': 0 if index is None or 'QC_Fail' not in index else int(index['QC_Fail'].sum()),
+        'clips_synced': 0 if synced is None else len(synced),
+        'balance_target': target,
+        'balanced': balanced,
+    }
+    atomic_write_json(stats, os.path.join(out_dir, STATS_JSON))
+    return stats
+
+
+def _relpath(path, start):
+    # Shards on another drive (Windows) cannot be expressed relatively
+    try:
+        return os.path.relpath(path, start)
+    except ValueError:
+        return os.path.abspath(path)
+
+
+def merge_shards(num_shards, root=SHARD_ROOT, merged_dir=MERGED_DIR):
+    """
+    Combines every shard's clip index, synced labels, balanced file list and
+    stats into merged_dir. Audio is not copied: each row gets a 'ClipPath'
+    relative to merged_dir that points into the shard that produced it.
+    Shards balance independently, so a class a shard has no samples of
+    ends up short of TARGET; the merged stats list that shortfall per class.
+    Returns the merged stats, or None if a shard has not finished.
+    """
+    dirs = [shard_dir(root, i, num_shards) for i in range(num_shards)]
+    missing = [d for d in dirs if not os.path.exists(os.path.join(d, STATS_JSON))]
+    if missing:
+        print(f"Error: {len(missing)} shard(s) not finished: {', '.join(missing)}")
+        return None
+
+    os.makedirs(merged_dir, exist_ok=True)
+    indexes, synced, balanced_rows, shard_stats = [], [], [], []
+
+    for i, d in enumerate(dirs):
+        with open(os.path.join(d, STATS_JSON), encoding="utf-8") as f:
+            shard_stats.append(json.load(f))
+
+        for name, subdir, frames in ((ingest.CLIP_INDEX, ingest.CLIPS_SUBDIR, indexes),
+                                     (ingest.SYNCED_CSV, ingest.STANDARDIZED_SUBDIR, synced)):
+            path = os.path.join(d, name)
+            if not os.path.exists(path):
+                continue
+            df = pd.read_csv(path)
+            df['Shard'] = i
+            df['ClipPath'] = [_relpath(os.path.join(d, subdir, f), merged_dir) for f in df['ClipFile']]
+            frames.append(df)
+
+        for s_type in STUTTER_TYPES:
+            class_dir = os.path.join(d, BALANCED_SUBDIR, s_type)
+            if not os.path.exists(class_dir):
+                continue
+            for fname in sorted(os.listdir(class_dir)):
+                if fname.endswith('.wav'):
+                    balanced_rows.append({'Class': s_type, 'Shard': i,
+                                          'ClipPath': _relpath(os.path.join(class_dir, fname), merged_dir)})
+
+    merged_index = pd.concat(indexes, ignore_index=True) if indexes else pd.DataFrame()
+    merged_synced = pd.concat(synced, ignore_index=True) if synced else pd.DataFrame()
+
+    # Shards own disjoint episodes, so a clip showing up twice means a bad split
+    if len(merged_index) and merged_index['ClipFile'].duplicated().any():
+        dupes = merged_index.loc[merged_index['ClipFile'].duplicated(), 'ClipFile'].head().tolist()
+        print(f"Error: clips present in more than one shard, e.g. {dupes}")
+        return None
+
+    atomic_write_csv(merged_index, os.path.join(merged_dir, ingest.CLIP_INDEX))
+    atomic_write_csv(merged_synced, os.path.join(merged_dir, ingest.SYNCED_CSV))
+    atomic_write_csv(pd.DataFrame(balanced_rows, columns=['Class', 'Shard', 'ClipPath']),
+                     os.path.join(merged_dir, BALANCED_MANIFEST))
+
+    balanced = {t: sum(s['balanced'].get(t, 0) for s in shard_stats) for t in STUTTER_TYPES}
+    stats = {
+        'num_shards': num_shards,
+        'shards': shard_stats,
+        'episodes': sum(s['episodes'] for s in shard_stats),
+        'clips_indexed': sum(s['clips_indexed'] for s in shard_stats),
+        'qc_failed': sum(s['qc_failed'] for s in shard_stats),
+        'clips_synced': sum(s['clips_synced'] for s in shard_stats),
+        'balanced': balanced,
+        'target': TARGET,
+        'shortfall': {t: max(TARGET - n, 0) for t, n in balanced.items()},
+        # Shards that produced nothing for a class (no samples, or --no-balance)
+        'empty_shards': {t: [s['shard'] for s in shard_stats if not s['balanced'].get(t, 0)]
+                         for t in STUTTER_TYPES},
+    }
+    atomic_write_json(stats, os.path.join(merged_dir, STATS_JSON))
+    return stats
+
+
+def launch_local(num_shards, argv):
+    """Starts one shard worker process per shard on this host and waits for all of them."""
+    procs = []
+    for i in range(num_shards):
+        cmd = [sys.executable, os.path.abspath(__file__), 'run',
+               '--shard', str(i), '--num-shards', str(num_shards)] + argv
+        procs.append((i, subprocess.Popen(cmd)))
+        print(f"Started shard {i} (pid {procs[-1][1].pid})")
+
+    failed = [i for i, p in procs if p.wait() != 0]
+    if failed:
+        print(f"Error: shard(s) {failed} exited with an error.")
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shard-by-episode pipeline runs and manifest merge.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_common(p):
+        p.add_argument('--num-shards', type=int, required=True)
+        p.add_argument('--root', default=SHARD_ROOT)
+
+    def add_pipeline(p):
+        p.add_argument('--corpora', nargs='+', choices=sorted(CORPORA), default=sorted(CORPORA))
+        p.add_argument('--stages', nargs='+', choices=ingest.STAGES, default=ingest.STAGES)
+        p.add_argument('--audio-dir', default=ingest.AUDIO_DIR)
+        p.add_argument('--workers', type=int)
+        p.add_argument('--download-workers', type=int, default=ingest.DOWNLOAD_WORKERS)
+        p.add_argument('--no-balance', action='store_true')
+        p.add_argument('--no-vad', action='store_true')
+
+    run_p = sub.add_parser('run', help="Process one shard (run this on each node)")
+    add_common(run_p)
+    run_p.add_argument('--shard', type=int, required=True)
+    add_pipeline(run_p)
+
+    merge_p = sub.add_parser('merge', help="Merge finished shards without copying audio")
+    add_common(merge_p)
+    merge_p.add_argument('--merged-dir', default=MERGED_DIR)
+
+    local_p = sub.add_parser('local', help="Run every shard as a separate process here, then merge")
+    add_common(local_p)
+    local_p.add_argument('--merged-dir', default=MERGED_DIR)
+    add_pipeline(local_p)
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        if not 0 <= args.shard < args.num_shards:
+            parser.error("--shard must be in [0, --num-shards)")
+        print("\n" + "="*40)
+        print(f"   SHARD {args.shard} OF {args.num_shards}")
+        print("="*40)
+        stats = run_shard(args.shard, args.num_shards, args.root, args.corpora, args.audio_dir,
+                          args.stages, args.workers or ingest.WORKERS, args.download_workers,
+                          balance=not args.no_balance, use_vad=not args.no_vad)
+        if stats is None:
+            sys.exit(1)
+        print(f"Shard stats: {json.dumps(stats)}")
+        return
+
+    if args.command == 'local':
+        # Split the cores between the shard processes
+        workers = args.workers or max((os.cpu_count() or 1) // args.num_shards, 1)
+        argv = ['--root', args.root, '--corpora', *args.corpora, '--stages', *args.stages,
+                '--audio-dir', args.audio_dir, '--workers', str(workers),
+                '--download-workers', str(args.download_workers)]
+        argv += ['--no-balance'] if args.no_balance else []
+        argv += ['--no-vad'] if args.no_vad else []
+        if not launch_local(args.num_shards, argv):
+            return
+
+    stats = merge_shards(args.num_shards, args.root, args.merged_dir)
+    if stats is None:
+        return
+
+    print("\n" + "="*40)
+    print(f"MERGED {args.num_shards} SHARDS")
+    print(f"Episodes:      {stats['episodes']}")
+    print(f"Clips indexed: {stats['clips_indexed']} (QC flagged {stats['qc_failed']})")
+    print(f"Clips synced:  {stats['clips_synced']}")
+    for s_type, count in stats['balanced'].items():
+        short = stats['shortfall'][s_type]
+        if short:
+            print(f"  - {s_type}: {count} (WARNING: {short} short of {stats['target']}; "
+                  f"nothing from shard(s) {stats['empty_shards'][s_type]})")
+        else:
+            print(f"  - {s_type}: {count}")
+    print(f"Merged tables: {args.merged_dir}")
+    print("="*40)
+
+
+if __name__ == "__main__":
+    main()
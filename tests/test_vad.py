@@ -0,0 +1,61 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vad
+
+SR = vad.SAMPLE_RATE
+
+
+def _noise(seconds, rng, level=0.001):
+    return (level * rng.standard_normal(int(seconds * SR))).astype(np.float32)
+
+
+def _voiced(seconds):
+    t = np.arange(int(seconds * SR)) / SR
+    return (0.3 * np.sin(2 * np.pi * 150 * t) + 0.1 * np.sin(2 * np.pi * 300 * t)).astype(np.float32)
+
+
+def test_sustained_speech_is_not_absorbed_by_the_noise_floor():
+    rng = np.random.default_rng(0)
+    y = _noise(30, rng)
+    y[10 * SR:25 * SR] += _voiced(15)
+
+    speech_map = vad.detect_array(y, SR)
+
+    # 15 s without a single pause must stay speech until the end
+    assert speech_map.speech_fraction(10 * SR, 25 * SR) > 0.99
+    assert speech_map.speech_fraction(0, 9 * SR) == 0.0
+
+
+def test_clicks_inside_a_hangover_do_not_split_the_region():
+    decisions = np.zeros(100, dtype=bool)
+    decisions[10:40] = True
+    decisions[45] = True
+    decisions[50] = True
+
+    detector = vad.StreamingVAD()
+    detector._decisions = [decisions]
+    regions = detector.finish().regions()
+
+    assert regions == [(10 * vad.HOP_LENGTH, (40 + vad.HANGOVER_FRAMES) * vad.HOP_LENGTH)]
+
+
+def test_isolated_click_is_dropped():
+    decisions = np.zeros(100, dtype=bool)
+    decisions[60:63] = True
+
+    detector = vad.StreamingVAD()
+    detector._decisions = [decisions]
+
+    assert detector.finish().regions() == []
+
+
+def test_white_noise_burst_is_not_speech():
+    rng = np.random.default_rng(1)
+    y = _noise(10, rng)
+    y[3 * SR:6 * SR] = 0.3 * rng.standard_normal(3 * SR)
+
+    assert vad.detect_array(y, SR).speech_seconds == 0.0
@@ -0,0 +1,272 @@
+import os
+import time
+import pickle
+import hashlib
+import random
+import argparse
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import f1_score
+from sklearn.naive_bayes import GaussianNB
+from sklearn.preprocessing import StandardScaler
+from class_balancing import STUTTER_TYPES
+from checkpointing import atomic_write_pickle
+from features import FEATURE_DIR, chunk_paths
+
+# ==========================================
+# PATH CONFIGURATION
+# ==========================================
+CHECKPOINT_DIR = r'F:\speech_to_text_predictor\models'
+
+MODELS = ['sgd', 'nb', 'kmeans_sgd']
+EPOCHS = 5
+N_CLUSTERS = 64            # Size of the MiniBatchKMeans encoding
+SEED = 42
+CLASSES = np.arange(len(STUTTER_TYPES))
+
+
+class StreamingModel:
+    """
+    Scaler -> (optional k-means encoder) -> classifier, all fitted with
+    partial_fit so training only ever needs one feature chunk in memory.
+
+    The scaler and encoder are fitted in a streaming pre-pass (see
+    prepare) and then frozen, so the classifier always learns on the same
+    transform that predict uses.
+
+    MiniBatchKMeans cannot initialise from fewer rows than it has clusters,
+    so rows are held back until enough have arrived for the encoder's first
+    update (or the pass ends, see finish_encoder). Later chunks that are too
+    small do not update it.
+    """
+
+    def __init__(self, kind, seed=SEED):
+        self.kind = kind
+        self.scaler = StandardScaler()
+        self.encoder = None
+        self._pending = []   # Scaled rows waiting for the encoder's first update
+        if kind == 'sgd':
+            self.clf = SGDClassifier(loss='log_loss', alpha=1e-4, random_state=seed)
+        elif kind == 'nb':
+            self.clf = GaussianNB()
+        elif kind == 'kmeans_sgd':
+            self.encoder = MiniBatchKMeans(n_clusters=N_CLUSTERS, random_state=seed)
+            self.clf = SGDClassifier(loss='log_loss', alpha=1e-4, random_state=seed)
+        else:
+            raise ValueError(f"Unknown model '{kind}'. Choose from {MODELS}.")
+
+    def _transform(self, X):
+        X = self.scaler.transform(X)
+        if self.encoder is not None:
+            # Distances to the centroids as a compact non-linear encoding
+            X = np.hstack([X, self.encoder.transform(X)])
+        return X
+
+    def _encoder_ready(self):
+        return hasattr(self.encoder, 'cluster_centers_')
+
+    def prepare(self, chunks):
+        """
+        Pre-pass over the training chunks: one pass fits the scaler, a second
+        fits the encoder on scaled rows. Both stay fixed afterwards.
+        """
+        for path in chunks:
+            X = load_chunk(path)['X']
+            if len(X):
+                self.scaler.partial_fit(X)
+        if self.encoder is None:
+            return
+        for path in chunks:
+            X = load_chunk(path)['X']
+            if len(X):
+                self.fit_encoder(self.scaler.transform(X))
+        self.finish_encoder()
+
+    def fit_encoder(self, X):
+        if self._encoder_ready():
+            if len(X) >= self.encoder.n_clusters:
+                self.encoder.partial_fit(X)
+            return
+        self._pending.append(X)
+        if sum(len(p) for p in self._pending) >= self.encoder.n_clusters:
+            self.finish_encoder()
+
+    def finish_encoder(self):
+        """
+        Fits the held-back rows. If fewer rows than clusters exist in total
+        (tiny datasets), the encoder is shrunk to the number of rows.
+        """
+        if not self._pending:
+            return
+        X = np.concatenate(self._pending)
+        self._pending = []
+        self.encoder.n_clusters = min(self.encoder.n_clusters, len(X))
+        self.encoder.partial_fit(X)
+
+    def partial_fit(self, X, y):
+        self.clf.partial_fit(self._transform(X), y, classes=CLASSES)
+
+    def predict(self, X):
+        return self.clf.predict(self._transform(X))
+
+
+def load_chunk(path):
+    with np.load(path) as chunk:
+        return {k: chunk[k] for k in chunk.files}
+
+
+def load_checkpoint(path):
+    """Returns (model, state) from a checkpoint, or (None, None) if there is none."""
+    if not os.path.exists(path):
+        return None, None
+    with open(path, 'rb') as f:
+        saved = pickle.load(f)
+    return saved['model'], saved['state']
+
+
+def inputs_fingerprint(chunks, epochs, seed=SEED):
+    """Identifies the feature chunks and schedule a checkpoint belongs to; a mismatch restarts training."""
+    digest = hashlib.md5()
+    for path in chunks:
+        digest.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return f"{digest.hexdigest()}-{epochs}-{seed}"
+
+
+def train(kind, feature_dir=FEATURE_DIR, checkpoint_dir=CHECKPOINT_DIR, epochs=EPOCHS, seed=SEED):
+    """
+    Fits the scaler/encoder in a pre-pass, then streams the training chunks
+    through the classifier's partial_fit for `epochs` passes and
+    checkpoints the model after every chunk. A restarted run picks up at the
+    first chunk that is not in the checkpoint yet, as long as the feature
+    store and epoch count are the ones the checkpoint was written for.
+    Returns (model, samples seen this run, wall-clock seconds incl. chunk I/O).
+    """
+    chunks = chunk_paths(feature_dir, 'train')
+    if not chunks:
+        raise FileNotFoundError(f"No training chunks in {feature_dir}. Run features.py first.")
+
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    ckpt_path = os.path.join(checkpoint_dir, f"{kind}.pkl")
+    fingerprint = inputs_fingerprint(chunks, epochs, seed)
+    model, state = load_checkpoint(ckpt_path)
+    if model is not None and state.get('inputs') != fingerprint:
+        print(f"Checkpoint for {kind} was trained on other features or epochs. Starting fresh.")
+        model = None
+    if model is None:
+        model, state = StreamingModel(kind, seed), {'epoch': 0, 'chunk': 0, 'inputs': fingerprint}
+        model.prepare(chunks)
+        atomic_write_pickle({'model': model, 'state': state}, ckpt_path)
+    elif state['epoch'] >= epochs:
+        print(f"{kind} is already trained on these features ({epochs} epochs).")
+    else:
+        print(f"Resuming {kind} at epoch {state['epoch'] + 1}, chunk {state['chunk']}.")
+
+    samples = 0
+    start = time.perf_counter()
+    while state['epoch'] < epochs:
+        # Visit chunks (and rows within them) in a new, reproducible order each epoch
+        rng = random.Random(f"{seed}-{state['epoch']}")
+        order = list(range(len(chunks)))
+        rng.shuffle(order)
+
+        for i in range(state['chunk'], len(order)):
+            chunk = load_chunk(chunks[order[i]])
+            X, y = chunk['X'], chunk['y']
+            if len(X):
+                perm = np.random.default_rng([seed, state['epoch'], i]).permutation(len(X))
+                model.partial_fit(X[perm], y[perm])
+                samples += len(X)
+
+            state = {'epoch': state['epoch'], 'chunk': i + 1, 'inputs': fingerprint}
+            atomic_write_pickle({'model': model, 'state': state}, ckpt_path)
+
+        print(f"[{kind}] epoch {state['epoch'] + 1}/{epochs} done")
+        state = {'epoch': state['epoch'] + 1, 'chunk': 0, 'inputs': fingerprint}
+        atomic_write_pickle({'model': model, 'state': state}, ckpt_path)
+
+    return model, samples, time.perf_counter() - start
+
+
+def evaluate(model, feature_dir=FEATURE_DIR):
+    """
+    Scores the held-out episodes chunk by chunk. Accuracy is reported over
+    all clips and per episode (grouped by Corpus/Show/EpId, since EpId alone
+    repeats across shows).
+    """
+    y_true, y_pred, groups = [], [], []
+    start = time.perf_counter()
+    for path in chunk_paths(feature_dir, 'holdout'):
+        chunk = load_chunk(path)
+        if not len(chunk['X']):
+            continue
+        y_true.append(chunk['y'])
+        y_pred.append(model.predict(chunk['X']))
+        groups.extend(f"{c}/{s}/{e}" for c, s, e in zip(chunk['Corpus'], chunk['Show'], chunk['EpId']))
+    elapsed = time.perf_counter() - start
+
+    if not y_true:
+        return None
+    y_true = np.concatenate(y_true)
+    y_pred = np.concatenate(y_pred)
+    groups = np.array(groups)
+
+    correct = y_true == y_pred
+    episodes, inverse = np.unique(groups, return_inverse=True)
+    per_episode = np.bincount(inverse, weights=correct) / np.bincount(inverse)
+
+    return {
+        'samples': len(y_true),
+        'accuracy': float(correct.mean()),
+        'macro_f1': float(f1_score(y_true, y_pred, labels=CLASSES, average='macro', zero_division=0)),
+        'episodes': len(episodes),
+        'episode_accuracy_mean': float(per_episode.mean()),
+        'episode_accuracy_worst': float(per_episode.min()),
+        'samples_per_sec': len(y_true) / max(elapsed, 1e-9),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-core training on the chunked feature store.")
+    parser.add_argument('--models', nargs='+', choices=MODELS, default=MODELS)
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--feature-dir', default=FEATURE_DIR)
+    parser.add_argument('--checkpoint-dir', default=CHECKPOINT_DIR)
+    args = parser.parse_args()
+
+    print("\n" + "="*40)
+    print("   INCREMENTAL MODEL TRAINING")
+    print("="*40)
+
+    for kind in args.models:
+        try:
+            model, samples, seconds = train(kind, args.feature_dir, args.checkpoint_dir, args.epochs)
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            return
+
+        report = evaluate(model, args.feature_dir)
+
+        print("\n" + "="*40)
+        print(f"MODEL: {kind}")
+        if samples:
+            print(f"Training throughput: {samples / max(seconds, 1e-9):.0f} samples/sec ({samples} samples)")
+        else:
+            print("Training throughput: n/a (checkpoint already complete, nothing trained this run)")
+        if report is None:
+            print("No held-out chunks to evaluate on.")
+        else:
+            print(f"Held-out clips:     {report['samples']} from {report['episodes']} episodes")
+            print(f"Accuracy:           {report['accuracy']:.3f}")
+            print(f"Macro F1:           {report['macro_f1']:.3f}")
+            print(f"Per-episode acc:    mean {report['episode_accuracy_mean']:.3f}, "
+                  f"worst {report['episode_accuracy_worst']:.3f}")
+            print(f"Eval throughput:    {report['samples_per_sec']:.0f} samples/sec")
+        print(f"Checkpoint: {os.path.join(args.checkpoint_dir, kind + '.pkl')}")
+        print("="*40)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import os
+import warnings
+from collections import deque
+import numpy as np
+import pandas as pd
+import librosa
+import soundfile as sf
+from tqdm import tqdm
+from checkpointing import atomic_write_csv
+
+# Suppress librosa/audioread warnings to keep terminal clean
+warnings.filterwarnings('ignore')
+
+# ---------------------------------------------------------
+# PATHS
+# ---------------------------------------------------------
+AUDIO_DIR = os.path.join('data', 'raw', 'audio')
+REGIONS_CSV = os.path.join('data', 'processed', 'vad_regions.csv')
+
+# ---------------------------------------------------------
+# VAD SETTINGS (all frame counts are in 10 ms hops at 16 kHz)
+# ---------------------------------------------------------
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 400         # 25 ms analysis window
+HOP_LENGTH = 160           # 10 ms between frames
+BLOCK_SECONDS = 30         # Audio is decoded and scored this much at a time
+
+ABS_MIN_DB = -55.0         # Frames quieter than this are never speech
+MARGIN_DB = 9.0            # Speech must sit this far above the noise floor
+MAX_FLATNESS = 0.45        # Flat (white-noise-like) spectra are not speech
+FLOOR_FALL = 0.3           # Noise floor follows quiet frames quickly...
+FLOOR_RISE = 0.002         # ...and loud frames only very slowly
+FLOOR_WINDOW = 2000        # The floor never rises more than FLOOR_CAP_DB above
+FLOOR_CAP_DB = 6.0         # the quietest frame of the last 20 s (long speech)
+HANGOVER_FRAMES = 25       # Keep 250 ms after speech so word endings survive
+MIN_SPEECH_FRAMES = 10     # Drop speech bursts shorter than 100 ms
+
+# A clip/window is skipped when less than this share of it is speech
+MIN_SPEECH_RATIO = 0.1
+
+
+class SpeechMap:
+    """Per-frame speech decisions for one recording, with O(1) range queries."""
+
+    def __init__(self, decisions, hop_length=HOP_LENGTH, sr=SAMPLE_RATE):
+        self.decisions = np.asarray(decisions, dtype=bool)
+        self.hop_length = hop_length
+        self.sr = sr
+        self._cumsum = np.concatenate([[0], np.cumsum(self.decisions)])
+
+    @property
+    def total_seconds(self):
+        return len(self.decisions) * self.hop_length / self.sr
+
+    @property
+    def speech_seconds(self):
+        return int(self._cumsum[-1]) * self.hop_length / self.sr
+
+    def speech_fraction(self, start, stop):
+        """Share of speech frames between two sample positions."""
+        f0 = min(max(int(start) // self.hop_length, 0), len(self.decisions))
+        f1 = min(max(-(-int(stop) // self.hop_length), f0), len(self.decisions))
+        if f1 == f0:
+            return 0.0
+        return (self._cumsum[f1] - self._cumsum[f0]) / (f1 - f0)
+
+    def regions(self):
+        """Speech regions as (start_sample, stop_sample) pairs."""
+        padded = np.concatenate([[False], self.decisions, [False]])
+        edges = np.flatnonzero(padded[1:] != padded[:-1])
+        return [(int(a) * self.hop_length, int(b) * self.hop_length)
+                for a, b in zip(edges[::2], edges[1::2])]
+
+
+class StreamingVAD:
+    """
+    Frame-energy + spectral-flatness voice activity detector.
+
+    Audio is fed block by block (feed) so a full episode never has to be
+    analysed in one piece; frames that straddle two blocks are handled by
+    carrying the leftover samples forward. feed() returns the raw per-frame
+    decisions; finish() smooths them and returns a SpeechMap.
+    """
+
+    def __init__(self):
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._window = np.hanning(FRAME_LENGTH).astype(np.float32)
+        self._floor = None
+        self._frame = 0
+        self._recent = deque()   # (frame, energy) with increasing energy: rolling minimum
+        self._decisions = []
+
+    def feed(self, block):
+        buf = np.concatenate([self._carry, np.asarray(block, dtype=np.float32)])
+        if len(buf) < FRAME_LENGTH:
+            self._carry = buf
+            return np.zeros(0, dtype=bool)
+
+        n_frames = (len(buf) - FRAME_LENGTH) // HOP_LENGTH + 1
+        frames = np.lib.stride_tricks.sliding_window_view(buf, FRAME_LENGTH)[::HOP_LENGTH][:n_frames]
+        self._carry = buf[n_frames * HOP_LENGTH:]
+
+        energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+        power = np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2 + 1e-12
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+
+        decisions = self._decide(energy_db, flatness)
+        self._decisions.append(decisions)
+        return decisions
+
+    def _decide(self, energy_db, flatness):
+        # The noise floor is a recursive estimate, so this part runs frame by frame
+        out = np.zeros(len(energy_db), dtype=bool)
+        # Seed the floor from the quietest frames of the first block
+        floor = np.percentile(energy_db, 10) if self._floor is None else self._floor
+        recent = self._recent
+        for i, (e, flat) in enumerate(zip(energy_db, flatness)):
+            out[i] = e > max(floor + MARGIN_DB, ABS_MIN_DB) and flat < MAX_FLATNESS
+            floor += (FLOOR_FALL if e < floor else FLOOR_RISE) * (e - floor)
+
+            # Without a cap the floor creeps up to the level of long
+            # pause-free speech and detection stops half way through it
+            frame = self._frame + i
+            while recent and recent[-1][1] >= e:
+                recent.pop()
+            recent.append((frame, e))
+            if recent[0][0] <= frame - FLOOR_WINDOW:
+                recent.popleft()
+            floor = min(floor, recent[0][1] + FLOOR_CAP_DB)
+        self._frame += len(energy_db)
+        self._floor = floor
+        return out
+
+    def finish(self):
+        # Zero-pad so the last partial hop still gets a frame of its own
+        if len(self._carry):
+            self.feed(np.zeros(FRAME_LENGTH - 1, dtype=np.float32))
+            self._carry = np.zeros(0, dtype=np.float32)
+        decisions = np.concatenate(self._decisions) if self._decisions else np.zeros(0, dtype=bool)
+        n_frames = len(decisions)
+
+        # Drop bursts too short to be speech (clicks, door slams) first, so
+        # a click inside a hangover tail cannot punch a hole into it later
+        for start, stop in SpeechMap(decisions, hop_length=1).regions():
+            if stop - start < MIN_SPEECH_FRAMES:
+                decisions[start:stop] = False
+
+        # Hangover: keep the tail so word endings survive
+        for start, stop in SpeechMap(decisions.copy(), hop_length=1).regions():
+            decisions[stop:min(stop + HANGOVER_FRAMES, n_frames)] = True
+        return SpeechMap(decisions)
+
+
+class GateStats:
+    """Counts what the VAD let through and what it saved."""
+
+    def __init__(self, sr=SAMPLE_RATE):
+        self.sr = sr
+        self.kept = 0
+        self.skipped = 0
+        self.kept_samples = 0
+        self.skipped_samples = 0
+
+    def keep(self, n_samples):
+        self.kept += 1
+        self.kept_samples += n_samples
+
+    def skip(self, n_samples):
+        self.skipped += 1
+        self.skipped_samples += n_samples
+
+    def merge(self, other):
+        self.kept += other.kept
+        self.skipped += other.skipped
+        self.kept_samples += other.kept_samples
+        self.skipped_samples += other.skipped_samples
+
+    def summary(self):
+        total = self.kept_samples + self.skipped_samples
+        saved = 100 * self.skipped_samples / total if total else 0.0
+        return (f"VAD skipped {self.skipped} of {self.kept + self.skipped} windows: "
+                f"{self.skipped_samples / self.sr:.1f}s of window audio, "
+                f"~{saved:.1f}% of downstream compute saved")
+
+
+def detect_array(y, sr=SAMPLE_RATE):
+    """Runs the VAD over an already decoded signal, one block at a time."""
+    if sr != SAMPLE_RATE:
+        y = librosa.resample(y, orig_sr=sr, target_sr=SAMPLE_RATE)
+    vad = StreamingVAD()
+    block = BLOCK_SECONDS * SAMPLE_RATE
+    for start in range(0, len(y), block):
+        vad.feed(y[start:start + block])
+    return vad.finish()
+
+
+def iter_blocks(path):
+    """
+    Yields mono 16 kHz blocks of a file without decoding it all at once.
+    Formats libsndfile cannot stream (e.g. .mp4) fall back to a full decode.
+    """
+    try:
+        info = sf.info(path)
+    except Exception:
+        y, _ = librosa.load(path, sr=SAMPLE_RATE)
+        block = BLOCK_SECONDS * SAMPLE_RATE
+        for start in range(0, len(y), block):
+            yield y[start:start + block]
+        return
+
+    blocksize = BLOCK_SECONDS * info.samplerate
+    for block in sf.blocks(path, blocksize=blocksize, dtype='float32', always_2d=True):
+        block = block.mean(axis=1)
+        if info.samplerate != SAMPLE_RATE:
+            block = librosa.resample(block, orig_sr=info.samplerate, target_sr=SAMPLE_RATE)
+        yield block
+
+
+def detect_file(path):
+    """Streams a whole episode through the VAD and returns its SpeechMap."""
+    vad = StreamingVAD()
+    for block in iter_blocks(path):
+        vad.feed(block)
+    return vad.finish()
+
+
+def speech_windows(y, speech_map, window, hop, stats=None, min_ratio=MIN_SPEECH_RATIO):
+    """
+    Yields (start_sample, window_audio) for every window that contains speech.
+    Meant for long-recording inference: non-speech windows are never scored.
+    """
+    for start in range(0, max(len(y) - window, 0) + 1, hop):
+        stop = min(start + window, len(y))
+        if speech_map.speech_fraction(start, stop) < min_ratio:
+            if stats is not None:
+                stats.skip(stop - start)
+            continue
+        if stats is not None:
+            stats.keep(stop - start)
+        yield start, y[start:stop]
+
+
+def main():
+    print("\n" + "="*40)
+    print("   VOICE ACTIVITY DETECTION")
+    print("="*40)
+
+    if not os.path.exists(AUDIO_DIR):
+        print(f"Error: Audio folder not found at {AUDIO_DIR}. Run downloader first.")
+        return
+
+    episodes = sorted(f for f in os.listdir(AUDIO_DIR) if not f.endswith('.part'))
+    rows = []
+    total_seconds = 0.0
+    speech_seconds = 0.0
+
+    for fname in tqdm(episodes, desc="Detecting Speech"):
+        try:
+            speech_map = detect_file(os.path.join(AUDIO_DIR, fname))
+        except Exception:
+            # If one episode is corrupted, skip it and keep going
+            continue
+        total_seconds += speech_map.total_seconds
+        speech_seconds += speech_map.speech_seconds
+        for start, stop in speech_map.regions():
+            rows.append({'AudioFile': fname, 'Start': start, 'Stop': stop})
+
+    os.makedirs(os.path.dirname(REGIONS_CSV), exist_ok=True)
+    atomic_write_csv(pd.DataFrame(rows, columns=['AudioFile', 'Start', 'Stop']), REGIONS_CSV)
+
+    print("\n" + "="*40)
+    print(f"Episodes analysed: {len(episodes)}")
+    print(f"Audio total:  {total_seconds / 3600:.2f} h")
+    print(f"Speech found: {speech_seconds / 3600:.2f} h")
+    print(f"Non-speech that later stages can skip: {(total_seconds - speech_seconds) / 3600:.2f} h")
+    print(f"Speech regions saved to: {REGIONS_CSV}")
+    print("="*40)
+
+
+if __name__ == "__main__":
+    main()